@@ -1,8 +1,38 @@
-const GIST_RAW_URL = 'https://gist.githubusercontent.com/DhonnanWork/16c307074f0e47ece82b500262347d75/raw/courses_data.json';
+const GIST_RAW_BASE_URL = 'https://gist.githubusercontent.com/DhonnanWork/16c307074f0e47ece82b500262347d75/raw/';
+const GIST_RAW_URL = GIST_RAW_BASE_URL + 'courses_data.json';
+// Precomputed by the scraper: active tugas, upcoming pertemuan and a manifest of per-course shards.
+const SUMMARY_RAW_URL = GIST_RAW_BASE_URL + 'summary.json';
 const CACHE_KEY = 'courses_data_cache';
+const SUMMARY_CACHE_KEY = 'courses_summary_cache';
 const REFRESH_ALARM_NAME = 'daily-data-refresh';
 
+async function fetchAndCacheSummary(timestamp) {
+  try {
+    const response = await fetch(SUMMARY_RAW_URL, { cache: 'no-store' });
+    if (!response.ok) {
+      throw new Error(`Summary request failed with status: ${response.status}`);
+    }
+    const summary = await response.json();
+    chrome.storage.local.set({
+      [SUMMARY_CACHE_KEY]: {
+        timestamp: timestamp,
+        data: summary
+      }
+    }, () => {
+      console.log('Summary successfully fetched from Gist and cached.');
+    });
+  } catch (error) {
+    // The popup falls back to walking the full data when no summary is cached.
+    console.error('Error fetching or caching summary:', error);
+  }
+}
+
 async function fetchAndCacheData() {
+  // Both caches of one refresh share a timestamp, so the popup can tell when
+  // the summary is older than the full data (its fetch failed this time).
+  const timestamp = new Date().toISOString();
+  // The summary is a few kilobytes; fetch it first so the popup is ready quickly.
+  await fetchAndCacheSummary(timestamp);
   console.log('Attempting to fetch data from Gist...');
   try {
     const response = await fetch(GIST_RAW_URL, {
@@ -19,7 +49,7 @@ async function fetchAndCacheData() {
 
     chrome.storage.local.set({
       [CACHE_KEY]: {
-        timestamp: new Date().toISOString(),
+        timestamp: timestamp,
         data: data
       }
     }, () => {
@@ -1,6 +1,21 @@
 const CACHE_KEY = 'courses_data_cache';
+const SUMMARY_CACHE_KEY = 'courses_summary_cache';
 const TUGAS_CHECK_KEY = 'tugas_checkmarks';
 
+// The cached summary, unless the full data was refreshed after it (e.g. the
+// summary fetch failed), in which case the full data is the fresher source.
+function loadSummary() {
+  return new Promise((resolve) => {
+    chrome.storage.local.get([SUMMARY_CACHE_KEY, CACHE_KEY], (result) => {
+      const cached = !chrome.runtime.lastError && result[SUMMARY_CACHE_KEY];
+      if (!cached || !cached.data) return resolve(null);
+      const full = result[CACHE_KEY];
+      const stale = full && full.timestamp && (!cached.timestamp || new Date(cached.timestamp) < new Date(full.timestamp));
+      resolve(stale ? null : cached.data);
+    });
+  });
+}
+
 async function loadAllCourseData() {
   return new Promise((resolve, reject) => {
     chrome.storage.local.get(CACHE_KEY, (result) => {
@@ -136,10 +151,61 @@ function makePengumpulanLink(tugas, course, pertemuanKey, checkmarks, updateChec
   return row;
 }
 
+function isFileShown(f) {
+  return f.title && !/Detail Aktivitas Pembelajaran/i.test(f.title) && !/[\[Batas Waktu Pengumpulan Tugas]/i.test(f.title);
+}
+
+// Renders from the scraper's precomputed summary: no course walk and no deadline regex parsing.
+function renderFromSummary(root, summary, checkmarks, updateCheckmark) {
+  // deadline_iso is naive local (WIB) time, so compare as Dates like isFuture()
+  const activeTugas = (summary.active_tugas || []).filter(t => t.deadline_iso ? isFuture(t.deadline_iso) : true);
+  const activePertemuan = new Set(activeTugas.map(t => `${t.course_kode}__${t.pertemuan}`));
+  const pertemuanFiles = [];
+  const activePengumpulan = [];
+
+  (summary.upcoming_pertemuan || []).forEach(p => {
+    if (activePertemuan.has(`${p.course_kode}__${p.pertemuan}`) || isFuture(p.date_iso)) {
+      (p.files || []).forEach(f => {
+        if (isFileShown(f)) {
+          pertemuanFiles.push(makeBlueLink(`${f.title} - ${p.course_nama}`, f.url));
+        }
+      });
+    }
+  });
+
+  activeTugas.forEach(t => {
+    const course = { course_info: { kode: t.course_kode, nama: t.course_nama } };
+    activePengumpulan.push(makePengumpulanLink(t, course, t.pertemuan, checkmarks, updateCheckmark));
+  });
+
+  root.innerHTML = '';
+  root.appendChild(renderDropdown('Bahan Ajar & Tugas (Pengumpulan Aktif/Future)', pertemuanFiles, true));
+  root.appendChild(renderDropdown('Pengumpulan Tugas Aktif', activePengumpulan, true));
+}
+
 function render() {
   const root = document.getElementById('sia-quick-root');
   root.textContent = 'Loading...';
 
+  const updateCheckmark = () => {
+    chrome.storage.local.get(TUGAS_CHECK_KEY, (result) => {
+      render();
+    });
+  };
+
+  Promise.all([
+    loadSummary(),
+    new Promise(res => chrome.storage.local.get(TUGAS_CHECK_KEY, r => res(r[TUGAS_CHECK_KEY] || {})))
+  ]).then(([summary, checkmarks]) => {
+    if (summary) {
+      renderFromSummary(root, summary, checkmarks, updateCheckmark);
+    } else {
+      renderFromFullData(root, updateCheckmark);
+    }
+  });
+}
+
+function renderFromFullData(root, updateCheckmark) {
   Promise.all([
     loadAllCourseData(),
     new Promise(res => chrome.storage.local.get(TUGAS_CHECK_KEY, r => res(r[TUGAS_CHECK_KEY] || {})))
@@ -148,12 +214,6 @@ function render() {
     const pertemuanFiles = [];
     const activePengumpulan = [];
 
-    const updateCheckmark = () => {
-      chrome.storage.local.get(TUGAS_CHECK_KEY, (result) => {
-        render();
-      });
-    };
-
     courses.forEach(course => {
       const courseName = course.course_info.nama;
       Object.entries(course.pertemuan || {}).forEach(([pertemuanKey, pertemuan]) => {
@@ -162,7 +222,7 @@ function render() {
 
         if (hasActiveTugas || pertemuanIsFuture) {
           (pertemuan.files || []).forEach(f => {
-            if (f.title && !/Detail Aktivitas Pembelajaran/i.test(f.title) && !/[\[Batas Waktu Pengumpulan Tugas]/i.test(f.title)) {
+            if (isFileShown(f)) {
               pertemuanFiles.push(makeBlueLink(`${f.title} - ${courseName}`, f.url));
             }
           });
@@ -1,12 +1,23 @@
 import os
+import re
+import sys
+import json
+import codecs
+import hashlib
+import argparse
 
 # --- Configuration ---
 # The name of the output file.
 output_filename = 'project_snapshot.txt'
 
+# Cache used by --incremental to reuse unchanged sections of the previous snapshot.
+cache_filename = '.project_snapshot_cache.json'
+
 # A list of files and directories to ignore in both the tree and the content snapshot.
+# Entries are matched against the entry name and against its path relative to the root.
 ignore_list = [
     output_filename,
+    cache_filename,
     os.path.basename(__file__),  # The script's own name
     '.git',                      # Git version control folder
     '.gradle',                   # Gradle's cache and wrapper files
@@ -18,7 +29,8 @@ ignore_list = [
 ]
 
 # List of file extensions that should be treated as non-text (binary).
-# The script will not attempt to read the content of these files.
+# Files with these extensions are skipped without being opened; anything else
+# is sniffed (see looks_binary) before its content is written.
 NON_TEXT_EXTENSIONS = {
     # Images
     '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff', '.webp', '.ico',
@@ -37,98 +49,633 @@ NON_TEXT_EXTENSIONS = {
     # Documents & Design Files
     '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.psd', '.ai', '.eps',
     # Other
-    '.icns','.crx','.pem','..env'
+    '.icns', '.crx', '.pem',
 }
 
+# Files whose content must never be written, regardless of extension.
+# (os.path.splitext('.env') has no extension, so these are matched by name,
+# together with their variants such as .env.local or .env.production.)
+NON_TEXT_FILENAMES = {'.env'}
+
+# How many leading bytes are inspected to decide whether a file is binary.
+SNIFF_BYTES = 8192
+
+# Files are streamed in chunks of this size, and cut off after MAX_FILE_BYTES.
+CHUNK_BYTES = 64 * 1024
+MAX_FILE_BYTES = 1024 * 1024
+
+SEPARATOR = "\n" + "=" * 80 + "\n\n"
+
+# Compact mode (--compact): files under these directories or with these name
+# endings are summarised instead of dumped, as is any text file whose sniffed
+# lines average more than MINIFIED_AVG_LINE_LENGTH bytes.
+VENDORED_DIRS = {'vendor', 'vendors', 'node_modules', 'third_party', 'bower_components'}
+MINIFIED_SUFFIXES = ('.min.js', '.min.css', '.min.mjs', '-min.js', '.bundle.js', '.js.map', '.css.map')
+MINIFIED_AVG_LINE_LENGTH = 300
+
+# Rough size of a token for --chunk-tokens; good enough for source code and English.
+BYTES_PER_TOKEN = 4
+
 # --- End Configuration ---
 
-def generate_and_write_tree(outfile, start_dir, ignore_list):
+CACHE_VERSION = 3
+
+# Bytes that commonly appear in text files; everything else below 0x20 counts as "binary".
+_TEXT_CONTROL_BYTES = {0x08, 0x09, 0x0A, 0x0C, 0x0D, 0x1B}
+
+
+def looks_binary(head):
     """
-    Generates a directory tree structure and writes it to the output file.
+    Decides whether a file is binary from its leading bytes.
+
+    A NUL byte is a sure sign; otherwise the file is binary when it does not
+    decode as UTF-8 and more than 30% of the sniffed bytes are control bytes.
     """
-    outfile.write("--- Project File Structure ---\n\n")
-    
-    # The root directory doesn't have a prefix.
-    outfile.write(f"{os.path.abspath(start_dir)}\n")
+    if not head:
+        return False
+    if b'\x00' in head:
+        return True
+    try:
+        head.decode('utf-8')
+        return False
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the sniff window is still text.
+        if e.start >= len(head) - 3 and e.reason == 'unexpected end of data':
+            return False
+    control = sum(1 for b in head if b < 0x20 and b not in _TEXT_CONTROL_BYTES)
+    return control / len(head) > 0.3
+
+
+def is_secret_filename(name):
+    return name in NON_TEXT_FILENAMES or any(name.startswith(f"{secret}.") for secret in NON_TEXT_FILENAMES)
+
+
+def is_text_file(filepath, head=None):
+    """
+    Checks if a file is likely a text file based on its name and leading bytes
+    (read from the file unless already given as `head`).
+    """
+    name = os.path.basename(filepath)
+    if is_secret_filename(name):
+        return False
+    _, ext = os.path.splitext(name)
+    if ext.lower() in NON_TEXT_EXTENSIONS:
+        return False
+    if head is None:
+        head = read_head(filepath)
+    return head is not None and not looks_binary(head)
+
+
+def read_head(filepath):
+    """The first SNIFF_BYTES of a file, or None if it cannot be read."""
+    try:
+        with open(filepath, 'rb') as f:
+            return f.read(SNIFF_BYTES)
+    except OSError:
+        return None
+
+
+# --- .gitignore support ---
+
+def _translate_glob(segment):
+    """Translates one path segment of a glob into a regex that never crosses '/'."""
+    out = []
+    i = 0
+    while i < len(segment):
+        c = segment[i]
+        if c == '*':
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = segment.find(']', i + 2)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = segment[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        elif c == '\\' and i + 1 < len(segment):
+            i += 1
+            out.append(re.escape(segment[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+def _compile_gitignore_pattern(pattern):
+    """
+    Turns one .gitignore line into (regex, negated, dir_only, anchored).
+    Returns None for blank lines and comments.
+    """
+    pattern = pattern.rstrip('\n').rstrip('\r')
+    if not pattern.strip() or pattern.startswith('#'):
+        return None
+    pattern = pattern.rstrip(' ')
+    negated = pattern.startswith('!')
+    if negated:
+        pattern = pattern[1:]
+    if pattern.startswith('\\'):
+        pattern = pattern[1:]
+    dir_only = pattern.endswith('/')
+    pattern = pattern.rstrip('/')
+    if not pattern:
+        return None
+    # A slash anywhere but the end anchors the pattern to the .gitignore's directory.
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+
+    parts = []
+    for segment in pattern.split('/'):
+        if segment == '**':
+            parts.append(None)
+        else:
+            parts.append(_translate_glob(segment))
+    regex = ''
+    for i, part in enumerate(parts):
+        last = i == len(parts) - 1
+        if part is None:
+            regex += '.*' if last else '(?:.*/)?'
+        else:
+            regex += part + ('' if last else '/')
+    return re.compile(regex + r'\Z'), negated, dir_only, anchored
 
-    # We use a recursive helper function to build the tree.
-    _recursive_tree_builder(outfile, start_dir, "", ignore_list)
-    
-    outfile.write("\n" + "=" * 80 + "\n\n")
-    print("✅ Project tree generated.")
 
-def _recursive_tree_builder(outfile, directory, prefix, ignore_list):
-    """A recursive helper to build and write the file tree."""
+def load_gitignore(directory):
+    """Reads the .gitignore in `directory`, if any, into a list of compiled rules."""
+    rules = []
     try:
-        # Get all entries in the directory, then filter and sort them.
-        entries = os.listdir(directory)
-        entries = sorted([e for e in entries if e not in ignore_list])
+        with open(os.path.join(directory, '.gitignore'), 'r', encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                rule = _compile_gitignore_pattern(line)
+                if rule:
+                    rules.append(rule)
+    except OSError:
+        pass
+    return rules
+
+
+def is_gitignored(rule_stack, rel_path, is_dir):
+    """
+    Checks `rel_path` (relative to the snapshot root, '/'-separated) against the
+    stacked rules of every .gitignore between the root and the entry. Later
+    rules win, so a deeper `!pattern` can re-include a file.
+    """
+    ignored = False
+    for base, rules in rule_stack:
+        local = rel_path[len(base) + 1:] if base else rel_path
+        name = local.rsplit('/', 1)[-1]
+        for regex, negated, dir_only, anchored in rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(local if anchored else name):
+                ignored = not negated
+    return ignored
+
+
+# --- Single-pass walker ---
+
+def walk_project(start_dir, ignore_list, use_gitignore=True):
+    """
+    Walks the project once with os.scandir.
+
+    Returns (tree_lines, files) where tree_lines is the rendered file tree and
+    files is a list of (rel_path, os.DirEntry) for every file, in tree order.
+    """
+    tree_lines = [os.path.abspath(start_dir)]
+    files = []
+    ignore_set = set(ignore_list)
+    rule_stack = [('', load_gitignore(start_dir))] if use_gitignore else []
+    _scan_directory(start_dir, '', '', ignore_set, rule_stack, tree_lines, files, use_gitignore)
+    return tree_lines, files
+
+
+def _scan_directory(directory, rel_dir, prefix, ignore_set, rule_stack, tree_lines, files, use_gitignore):
+    """A recursive helper that renders the tree and collects files in the same pass."""
+    try:
+        with os.scandir(directory) as it:
+            entries = []
+            for entry in it:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if entry.name in ignore_set or rel_path in ignore_set:
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if rule_stack and is_gitignored(rule_stack, rel_path, is_dir):
+                    continue
+                entries.append((entry.name, rel_path, is_dir, entry))
     except OSError:
         # Ignore directories we can't read.
         return
 
-    for i, entry in enumerate(entries):
+    entries.sort(key=lambda e: e[0])
+    for i, (name, rel_path, is_dir, entry) in enumerate(entries):
         is_last = (i == len(entries) - 1)
         # Use different connectors for the last item in a directory.
         connector = "└── " if is_last else "├── "
-        
-        outfile.write(f"{prefix}{connector}{entry}\n")
-        
-        path = os.path.join(directory, entry)
-        if os.path.isdir(path):
+        tree_lines.append(f"{prefix}{connector}{name}")
+
+        if is_dir:
             # The prefix for children is extended based on whether the current item was the last.
             extension = "    " if is_last else "│   "
-            _recursive_tree_builder(outfile, path, prefix + extension, ignore_list)
+            child_stack = rule_stack
+            if use_gitignore:
+                child_rules = load_gitignore(entry.path)
+                if child_rules:
+                    child_stack = rule_stack + [(rel_path, child_rules)]
+            _scan_directory(entry.path, rel_path, prefix + extension, ignore_set, child_stack,
+                            tree_lines, files, use_gitignore)
+        else:
+            files.append((rel_path, entry))
 
-def is_text_file(filepath):
+
+# --- Section writers ---
+
+def _display_path(rel_path):
+    """Keeps the './dir/file' style headers of the original snapshot format."""
+    return os.path.join('.', *rel_path.split('/'))
+
+
+def write_file_section(outfile, rel_path, file_path, max_file_bytes=MAX_FILE_BYTES):
     """
-    Checks if a file is likely a text file based on its extension.
+    Streams one file's section into `outfile` (opened in binary mode).
+
+    Returns the sha1 hex digest of the bytes that were read, or None if the
+    content was not read (binary or unreadable).
     """
-    if '.' not in os.path.basename(filepath):
-        return True # Treat files with no extension as text
-    _, ext = os.path.splitext(filepath)
-    return ext.lower() not in NON_TEXT_EXTENSIONS
+    outfile.write(f"--- File: {_display_path(rel_path)} ---\n".encode('utf-8'))
+    name = os.path.basename(rel_path)
+    _, ext = os.path.splitext(name)
+    if is_secret_filename(name) or ext.lower() in NON_TEXT_EXTENSIONS:
+        kind = name if is_secret_filename(name) else ext
+        outfile.write(f"*** Non-text file detected ({kind}). Content not displayed. ***\n".encode('utf-8'))
+        outfile.write(SEPARATOR.encode('utf-8'))
+        return None
 
-def create_project_snapshot():
+    digest = hashlib.sha1()
+    try:
+        with open(file_path, 'rb') as infile:
+            chunk = infile.read(min(SNIFF_BYTES, max_file_bytes))
+            if looks_binary(chunk):
+                outfile.write(f"*** Non-text file detected ({ext or 'no extension'}). Content not displayed. ***\n".encode('utf-8'))
+                outfile.write(SEPARATOR.encode('utf-8'))
+                return None
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+            remaining = max_file_bytes
+            while chunk:
+                digest.update(chunk)
+                remaining -= len(chunk)
+                outfile.write(decoder.decode(chunk).encode('utf-8'))
+                if remaining <= 0:
+                    break
+                chunk = infile.read(min(CHUNK_BYTES, remaining))
+            outfile.write(decoder.decode(b'', final=True).encode('utf-8'))
+            if remaining <= 0 and infile.read(1):
+                outfile.write(f"\n*** Truncated after {max_file_bytes} bytes. ***\n".encode('utf-8'))
+    except Exception as e:
+        outfile.write(f"*** Could not read file content. Reason: {e} ***\n".encode('utf-8'))
+        outfile.write(SEPARATOR.encode('utf-8'))
+        return None
+
+    outfile.write(SEPARATOR.encode('utf-8'))
+    return digest.hexdigest()
+
+
+# --- Compact mode: duplicates and minified/vendored files ---
+
+def file_digest(file_path, max_file_bytes=MAX_FILE_BYTES):
+    """sha1 of the first max_file_bytes of a file (the bytes a section would contain)."""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        remaining = max_file_bytes
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def is_minified_or_vendored(rel_path, head):
+    """
+    True for files that are noise in a snapshot: vendored directories, names
+    like *.min.js, and text whose lines are far longer than hand-written code.
+    """
+    parts = rel_path.lower().split('/')
+    if any(part in VENDORED_DIRS for part in parts[:-1]):
+        return True
+    if parts[-1].endswith(MINIFIED_SUFFIXES):
+        return True
+    if len(head) >= 2048:
+        return len(head) / (head.count(b'\n') + 1) > MINIFIED_AVG_LINE_LENGTH
+    return False
+
+
+def write_duplicate_section(outfile, rel_path, first_rel_path):
+    outfile.write(f"--- File: {_display_path(rel_path)} ---\n".encode('utf-8'))
+    outfile.write(f"*** Identical to {_display_path(first_rel_path)}. Content not repeated. ***\n".encode('utf-8'))
+    outfile.write(SEPARATOR.encode('utf-8'))
+
+
+def write_summary_section(outfile, rel_path, size, head):
+    """Replaces a minified/vendored file's content by its size and first line (usually name and version)."""
+    first_line = head.split(b'\n', 1)[0][:200].decode('utf-8', errors='ignore').strip()
+    outfile.write(f"--- File: {_display_path(rel_path)} ---\n".encode('utf-8'))
+    outfile.write(f"*** Minified or vendored file ({size} bytes). Content not displayed. ***\n".encode('utf-8'))
+    if first_line:
+        outfile.write(f"First line: {first_line}\n".encode('utf-8'))
+    outfile.write(SEPARATOR.encode('utf-8'))
+
+
+# --- Output: one file, or chunks with an index ---
+
+def chunk_filename(number):
+    base, ext = os.path.splitext(output_filename)
+    return f"{base}.{number:03d}{ext}"
+
+
+def index_filename():
+    base, ext = os.path.splitext(output_filename)
+    return f"{base}.index{ext}"
+
+
+def existing_output_names(start_dir):
+    """The snapshot's own output files in start_dir, so the walk can skip them."""
+    base, ext = os.path.splitext(output_filename)
+    pattern = re.compile(re.escape(base) + r'\.(?:\d{3,}|index)' + re.escape(ext) + r'(?:\.tmp)?\Z')
+    try:
+        return [name for name in os.listdir(start_dir) if pattern.match(name)]
+    except OSError:
+        return []
+
+
+class SnapshotWriter:
+    """
+    Writes file sections either into the single output file (after the tree)
+    or, with chunk_bytes, into numbered chunk files that each stay under the
+    budget. A section is never split, so one larger than the budget gets a
+    chunk of its own. Everything goes to .tmp files until finish().
+    """
+
+    def __init__(self, start_dir, preamble, chunk_bytes=None):
+        self.start_dir = start_dir
+        self.chunk_bytes = chunk_bytes
+        self.preamble = preamble
+        self.chunks = []  # [name, [rel_path, ...]]
+        self.outfile = None
+        if not chunk_bytes:
+            self._open(output_filename, preamble)
+
+    def _open(self, name, header):
+        if self.outfile:
+            self.outfile.close()
+        self.outfile = open(os.path.join(self.start_dir, name + '.tmp'), 'wb')
+        self.outfile.write(header)
+        self.chunks.append([name, []])
+
+    def section(self, rel_path, estimated_size):
+        """Returns (outfile, chunk_name) to write the next section to, starting a new chunk if it would not fit."""
+        if self.chunk_bytes:
+            fits = self.outfile and self.chunks[-1][1] and self.outfile.tell() + estimated_size <= self.chunk_bytes
+            if not fits:
+                number = len(self.chunks) + 1
+                self._open(chunk_filename(number), f"--- File Contents (part {number}) ---\n\n".encode('utf-8'))
+        self.chunks[-1][1].append(rel_path)
+        return self.outfile, self.chunks[-1][0]
+
+    def finish(self, notes):
+        """Moves the outputs into place, writes the index and removes chunks left over from a longer snapshot."""
+        if self.outfile:
+            self.outfile.close()
+        names = [name for name, _ in self.chunks]
+        for name in names:
+            os.replace(os.path.join(self.start_dir, name + '.tmp'), os.path.join(self.start_dir, name))
+        if not self.chunk_bytes:
+            # Chunks and index from an earlier chunked snapshot would now be stale.
+            for name in existing_output_names(self.start_dir):
+                if not name.endswith('.tmp'):
+                    os.remove(os.path.join(self.start_dir, name))
+            return names
+
+        index_path = os.path.join(self.start_dir, index_filename())
+        with open(index_path + '.tmp', 'wb') as f:
+            f.write(self.preamble)
+            f.write("--- Chunks ---\n\n".encode('utf-8'))
+            for name, rel_paths in self.chunks:
+                size = os.path.getsize(os.path.join(self.start_dir, name))
+                f.write(f"{name} ({size} bytes, ~{size // BYTES_PER_TOKEN} tokens)\n".encode('utf-8'))
+                for rel_path in rel_paths:
+                    f.write(f"    {_display_path(rel_path)}\n".encode('utf-8'))
+            for title, lines in notes:
+                if lines:
+                    f.write(SEPARATOR.encode('utf-8'))
+                    f.write(f"--- {title} ---\n\n".encode('utf-8'))
+                    f.write(("\n".join(lines) + "\n").encode('utf-8'))
+        os.replace(index_path + '.tmp', index_path)
+
+        for name in existing_output_names(self.start_dir):
+            if name not in names and name != index_filename():
+                os.remove(os.path.join(self.start_dir, name))
+        # A previous single-file snapshot would now be stale.
+        if os.path.exists(os.path.join(self.start_dir, output_filename)):
+            os.remove(os.path.join(self.start_dir, output_filename))
+        return names + [index_filename()]
+
+
+# --- Incremental cache ---
+
+def load_cache(cache_path, start_dir, options):
+    """
+    Loads the incremental cache, but only if it was written with the same
+    options and the output files it describes are still the ones on disk
+    (same size and mtime). Otherwise returns None.
+    """
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cache.get('version') != CACHE_VERSION or cache.get('options') != options:
+        return None
+    for name, (size, mtime_ns) in cache.get('outputs', {}).items():
+        try:
+            st = os.stat(os.path.join(start_dir, name))
+        except OSError:
+            return None
+        if st.st_size != size or st.st_mtime_ns != mtime_ns:
+            return None
+    return cache
+
+
+def save_cache(cache_path, start_dir, output_names, entries, options):
+    outputs = {}
+    for name in output_names:
+        st = os.stat(os.path.join(start_dir, name))
+        outputs[name] = [st.st_size, st.st_mtime_ns]
+    cache = {
+        'version': CACHE_VERSION,
+        'options': options,
+        'outputs': outputs,
+        'entries': entries,
+    }
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+
+def create_project_snapshot(start_dir='.', incremental=False, max_file_bytes=MAX_FILE_BYTES, use_gitignore=True,
+                            compact=False, chunk_bytes=None):
     """
     Creates a snapshot of the project, starting with a file tree,
     followed by the content of all text-based files.
+
+    With `incremental`, files whose mtime and size match the cache are not
+    re-read: their section is copied byte-for-byte from the previous snapshot.
+    With `compact`, files identical to an earlier one are written as a
+    reference to it and minified/vendored files are summarised. With
+    `chunk_bytes`, the contents are split into numbered chunks of at most
+    that size and the tree goes into an index file listing every chunk.
     """
-    with open(output_filename, 'w', encoding='utf-8', errors='replace') as outfile:
-        # --- 1. Generate and write the project tree first ---
-        generate_and_write_tree(outfile, '.', ignore_list)
-
-        # --- 2. Write the content of each file ---
-        outfile.write("--- File Contents ---\n\n")
-        
-        for dirpath, dirnames, filenames in os.walk('.', topdown=True):
-            # Filter directories and files based on the ignore list.
-            dirnames[:] = [d for d in dirnames if d not in ignore_list]
-            
-            for filename in sorted(filenames): # Sort for consistent order
-                if filename in ignore_list:
-                    continue
+    cache_path = os.path.join(start_dir, cache_filename)
+    options = {'max_file_bytes': max_file_bytes, 'compact': compact, 'chunk_bytes': chunk_bytes}
+
+    tree_lines, files = walk_project(start_dir, ignore_list + existing_output_names(start_dir), use_gitignore)
+    print("✅ Project tree generated.")
+
+    cache = load_cache(cache_path, start_dir, options) if incremental else None
+    old_entries = cache['entries'] if cache else {}
+    new_entries = {}
+    rebuilt = reused = 0
+    first_by_digest = {}
+    duplicates = []
+    summarised = []
+
+    preamble = ("--- Project File Structure ---\n\n" + "\n".join(tree_lines) + "\n" + SEPARATOR).encode('utf-8')
+    if not chunk_bytes:
+        preamble += "--- File Contents ---\n\n".encode('utf-8')
+    header_bytes = len(SEPARATOR) + 200
 
-                file_path = os.path.join(dirpath, filename)
-                header = f"--- File: {file_path} ---\n"
-                print(f"Processing: {file_path}")
-                outfile.write(header)
-
-                if is_text_file(file_path):
-                    try:
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as infile:
-                            content = infile.read()
-                            outfile.write(content)
-                    except Exception as e:
-                        outfile.write(f"*** Could not read file content. Reason: {e} ***\n")
+    old_outputs = {}
+    writer = SnapshotWriter(start_dir, preamble, chunk_bytes)
+    try:
+        for rel_path, entry in files:
+            try:
+                st = entry.stat()
+                mtime_ns, size = st.st_mtime_ns, st.st_size
+            except OSError:
+                mtime_ns, size = None, None
+            old = old_entries.get(rel_path)
+            unchanged = old and old['mtime_ns'] == mtime_ns and old['size'] == size
+
+            # Compact mode needs the content hash up front; text/minified are cached per file.
+            kind = 'full'
+            sha1 = old['sha1'] if unchanged else None
+            head = None
+            text = minified = False
+            if compact and size is not None:
+                if unchanged and 'minified' in old:
+                    text, minified = old['text'], old['minified']
                 else:
-                    ext = os.path.splitext(file_path)[1]
-                    outfile.write(f"*** Non-text file detected ({ext}). Content not displayed. ***\n")
+                    head = read_head(entry.path)
+                    text = head is not None and is_text_file(entry.path, head)
+                    minified = text and is_minified_or_vendored(rel_path, head)
+                if text and sha1 is None:
+                    sha1 = hashlib.sha1(head).hexdigest() if size <= len(head) else file_digest(entry.path, max_file_bytes)
+                if text and (size, sha1) in first_by_digest:
+                    kind = 'duplicate'
+                elif minified:
+                    kind = 'summary'
+                elif text:
+                    first_by_digest[(size, sha1)] = rel_path
+
+            if kind == 'duplicate':
+                first = first_by_digest[(size, sha1)]
+                outfile, chunk = writer.section(rel_path, header_bytes)
+                offset = outfile.tell()
+                write_duplicate_section(outfile, rel_path, first)
+                duplicates.append(f"{_display_path(rel_path)} -> {_display_path(first)}")
+            elif unchanged and old.get('kind', 'full') == kind:
+                outfile, chunk = writer.section(rel_path, old['length'])
+                offset = outfile.tell()
+                if old['chunk'] not in old_outputs:
+                    old_outputs[old['chunk']] = open(os.path.join(start_dir, old['chunk']), 'rb')
+                old_snapshot = old_outputs[old['chunk']]
+                old_snapshot.seek(old['offset'])
+                outfile.write(old_snapshot.read(old['length']))
+                reused += 1
+            elif kind == 'summary':
+                outfile, chunk = writer.section(rel_path, header_bytes * 2)
+                offset = outfile.tell()
+                write_summary_section(outfile, rel_path, size, head if head is not None else read_head(entry.path) or b'')
+                rebuilt += 1
+            else:
+                print(f"Processing: {_display_path(rel_path)}")
+                outfile, chunk = writer.section(rel_path, min(size or 0, max_file_bytes) + header_bytes)
+                offset = outfile.tell()
+                sha1 = write_file_section(outfile, rel_path, entry.path, max_file_bytes)
+                rebuilt += 1
+            if kind == 'summary':
+                summarised.append(f"{_display_path(rel_path)} ({size} bytes)")
+
+            new_entries[rel_path] = {
+                'mtime_ns': mtime_ns,
+                'size': size,
+                'sha1': sha1,
+                'kind': kind,
+                'text': text,
+                'minified': minified,
+                'chunk': chunk,
+                'offset': offset,
+                'length': outfile.tell() - offset,
+            }
+    finally:
+        for old_snapshot in old_outputs.values():
+            old_snapshot.close()
+
+    output_names = writer.finish([('Deduplicated files', duplicates), ('Summarised files', summarised)])
+    if incremental:
+        save_cache(cache_path, start_dir, output_names, new_entries, options)
+        print(f"Rebuilt {rebuilt} file section(s), reused {reused} from the previous snapshot.")
+    if compact:
+        print(f"Deduplicated {len(duplicates)} file(s), summarised {len(summarised)} minified/vendored file(s).")
+
+    if chunk_bytes:
+        print(f"\n✅ Success! Project snapshot has been written to {len(output_names) - 1} chunk(s), "
+              f"indexed in '{os.path.join(start_dir, index_filename())}'")
+    else:
+        print(f"\n✅ Success! Project snapshot has been written to '{os.path.join(start_dir, output_filename)}'")
 
-                outfile.write("\n" + "=" * 80 + "\n\n")
 
-    print(f"\n✅ Success! Project snapshot has been written to '{output_filename}'")
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Write a text snapshot of the project tree and file contents.")
+    parser.add_argument('root', nargs='?', default='.', help="Directory to snapshot (default: current directory).")
+    parser.add_argument('--incremental', action='store_true',
+                        help=f"Reuse unchanged sections of the previous snapshot via {cache_filename}.")
+    parser.add_argument('--max-file-bytes', type=int, default=MAX_FILE_BYTES,
+                        help="Truncate each file's content after this many bytes.")
+    parser.add_argument('--no-gitignore', action='store_true', help="Do not honour .gitignore files.")
+    parser.add_argument('--compact', action='store_true',
+                        help="Write duplicate files as a reference to the first copy and summarise minified/vendored files.")
+    budget = parser.add_mutually_exclusive_group()
+    budget.add_argument('--chunk-bytes', type=int,
+                        help="Split the contents into chunks of at most this many bytes, with an index file.")
+    budget.add_argument('--chunk-tokens', type=int,
+                        help=f"Like --chunk-bytes, estimating {BYTES_PER_TOKEN} bytes per token.")
+    args = parser.parse_args(argv)
+    if args.chunk_tokens:
+        args.chunk_bytes = args.chunk_tokens * BYTES_PER_TOKEN
+    return args
 
 
 if __name__ == "__main__":
-    create_project_snapshot()   
\ No newline at end of file
+    args = parse_args(sys.argv[1:])
+    create_project_snapshot(args.root, incremental=args.incremental,
+                            max_file_bytes=args.max_file_bytes, use_gitignore=not args.no_gitignore,
+                            compact=args.compact, chunk_bytes=args.chunk_bytes)
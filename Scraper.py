@@ -1,14 +1,24 @@
 import os
 import re
+import sys
 import time
 import base64
 import json
+import socket
+import argparse
 import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
-import google.generativeai as genai
 from dotenv import load_dotenv
-from PIL import Image
+from consumer_views import write_views
+from records import Course, CourseInfo, Tugas, write_json, read_json
+from work_queue import WorkQueue, QUEUE_FILE
+from tugas_index import TugasIndex, course_id, course_of, pertemuan_id, tugas_id
+from html_parse import parse_course_list, parse_course_detail, parse_tugas_page, parse_deadline
+from forensics import FailureRecorder
+from history_store import HistoryStore, HISTORY_FILENAME
+from html_store import HtmlStore, HTML_STORE_DIRNAME, course_list_identity, course_detail_identity, tugas_page_identity
 
 load_dotenv()
 
@@ -18,26 +28,64 @@ PASSWORD = os.getenv("PASSWORD")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 MAX_RESTARTS = 1
 STATE_FILE = "scraper_state.json"
+SESSION_FILE = "session_state.json"
+RUN_SUMMARY_FILE = "run_summary.json"
+
+# Browser recycling: a long run through every course makes Firefox grow, so the
+# page (or the whole context) is replaced once either limit is crossed.
+MAX_BROWSER_RSS_MB = int(os.getenv("MAX_BROWSER_RSS_MB", "1500"))
+MAX_NAVIGATIONS_PER_PAGE = int(os.getenv("MAX_NAVIGATIONS_PER_PAGE", "300"))
+
+# Processes parsing captured pages while the browser moves on (see html_parse.py).
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "2"))
+
+# Daemon mode: an idle page still shows the courses list after the server has
+# dropped the session (ASP.NET's default timeout is 20 minutes), so after this
+# long without a navigation the session is checked before the next course.
+DAEMON_SESSION_CHECK_MINUTES = float(os.getenv("DAEMON_SESSION_CHECK_MINUTES", "10"))
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/115.0"
 
 LOGIN_URL = "https://sia.polytechnic.astra.ac.id/sso/Page_Login.aspx"
 COURSES_LIST_PAGE_URL = "https://sia.polytechnic.astra.ac.id/Page_Pelaksanaan_Aktivitas_Pembelajaran.aspx"
 SSO_BASE_URL = "https://sia.polytechnic.astra.ac.id/sso/"
 SIA_BASE_URL = "https://sia.polytechnic.astra.ac.id/"
 
-# Initialize Gemini
-if GEMINI_API_KEY and GEMINI_API_KEY not in ["YOUR_GEMINI_API_KEY_HERE", ""]:
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        print("Gemini model initialized successfully.")
-    except Exception as e:
-        model = None
-        print(f"Error initializing Gemini: {e}. CAPTCHA solving will be skipped or fail.")
-else:
-    model = None
-    print("Warning: Gemini API key not configured. CAPTCHA solving will be skipped or fail.")
+# Heavy dependencies are imported on first use, so commands that never open a
+# browser (aggregate) or never see a CAPTCHA (resumed sessions) skip the cost.
+sync_playwright = None
+PlaywrightTimeoutError = None
+_gemini_model = None
+_gemini_initialized = False
+
+def load_playwright():
+    global sync_playwright, PlaywrightTimeoutError
+    if sync_playwright is None:
+        from playwright.sync_api import sync_playwright as _sync_playwright, TimeoutError as _TimeoutError
+        sync_playwright, PlaywrightTimeoutError = _sync_playwright, _TimeoutError
+    return sync_playwright
+
+def get_gemini_model():
+    """Initializes Gemini the first time a CAPTCHA actually needs solving."""
+    global _gemini_model, _gemini_initialized
+    if _gemini_initialized:
+        return _gemini_model
+    _gemini_initialized = True
+    if GEMINI_API_KEY and GEMINI_API_KEY not in ["YOUR_GEMINI_API_KEY_HERE", ""]:
+        try:
+            import google.generativeai as genai
+            genai.configure(api_key=GEMINI_API_KEY)
+            _gemini_model = genai.GenerativeModel('gemini-1.5-flash')
+            print("Gemini model initialized successfully.")
+        except Exception as e:
+            _gemini_model = None
+            print(f"Error initializing Gemini: {e}. CAPTCHA solving will be skipped or fail.")
+    else:
+        print("Warning: Gemini API key not configured. CAPTCHA solving will be skipped or fail.")
+    return _gemini_model
 
 def solve_captcha_with_gemini(page):
+    model = get_gemini_model()
     if not model:
         print("Gemini model not initialized. Skipping CAPTCHA solving.")
         return "MANUAL_INPUT_REQUIRED"
@@ -48,8 +96,8 @@ def solve_captcha_with_gemini(page):
         page.wait_for_timeout(500)  # Allow image to render
         captcha_img_locator.screenshot(path="captcha.png")
     except Exception as e:
+        # The session's forensics buffer holds this page if the login ends up failing
         print(f"Error locating or screenshotting CAPTCHA: {e}")
-        page.screenshot(path="captcha_error_page.png")
         return None
 
     if not os.path.exists("captcha.png"):
@@ -93,6 +141,129 @@ def handle_captcha(page, attempt):
     page.click("#MainContent_btnLogin")
     return True
 
+# --- Login state machine ---
+# Each CAPTCHA submit races three outcomes: the dashboard URL, the red error
+# label, or a re-rendered CAPTCHA. Before submitting, the old error text is
+# cleared and the old CAPTCHA image is tagged, so either a full postback or a
+# partial (UpdatePanel) one is recognised as soon as the server answers.
+LOGIN_OUTCOME_TIMEOUT_MS = 20000
+
+_ARM_LOGIN_OUTCOME_JS = """() => {
+    const label = document.querySelector('#MainContent_lblMessage');
+    if (label) label.textContent = '';
+    const captcha = document.querySelector('#MainContent_imgCaptcha');
+    if (captcha) captcha.setAttribute('data-sia-stale', '1');
+}"""
+
+_LOGIN_OUTCOME_JS = """() => {
+    if (location.href.toLowerCase().includes('default.aspx')) return 'dashboard';
+    const label = document.querySelector('#MainContent_lblMessage');
+    if (label && /color:\\s*red/i.test(label.getAttribute('style') || '') && label.textContent.trim()) {
+        return 'error:' + label.textContent.trim();
+    }
+    const captcha = document.querySelector('#MainContent_imgCaptcha');
+    if (captcha && !captcha.hasAttribute('data-sia-stale')) return 'captcha';
+    return null;
+}"""
+
+def is_dashboard_url(url):
+    return url.startswith(SIA_BASE_URL) and "default.aspx" in url.lower()
+
+def arm_login_outcome(page):
+    try:
+        page.evaluate(_ARM_LOGIN_OUTCOME_JS)
+    except Exception as e:
+        print(f"Could not arm login outcome watcher: {e}")
+
+def wait_for_login_outcome(page, timeout=LOGIN_OUTCOME_TIMEOUT_MS):
+    """
+    Waits for whichever login outcome happens first. Returns 'dashboard',
+    'error', 'captcha' or 'timeout', plus the error label text if any.
+    The predicate is re-run on the new document after a navigation.
+    """
+    try:
+        handle = page.wait_for_function(_LOGIN_OUTCOME_JS, timeout=timeout, polling=100)
+        outcome = handle.json_value()
+    except PlaywrightTimeoutError:
+        return ("dashboard", None) if is_dashboard_url(page.url) else ("timeout", None)
+    if outcome.startswith("error:"):
+        return "error", outcome[len("error:"):].lower()
+    return outcome, None
+
+def login(page):
+    """
+    Logs in through the SSO page as an explicit state machine:
+
+        OPEN -> SUBMIT -> (SUCCESS | SUBMIT | REFRESH_CAPTCHA | OPEN | FAILED)
+
+    Returns (success, attempts) where attempts records the outcome and the
+    time each CAPTCHA submit took.
+    """
+    attempts = []
+    attempt = 0
+    state = "OPEN"
+    while True:
+        if state == "OPEN":
+            print(f"Navigating to login page: {LOGIN_URL}")
+            page.goto(LOGIN_URL, timeout=60000)
+            page.fill("#txtUsername", USERNAME if USERNAME is not None else "")
+            state = "SUBMIT"
+
+        elif state == "SUBMIT":
+            if attempt >= MAX_CAPTCHA_ATTEMPTS:
+                print("Max login attempts reached.")
+                state = "FAILED"
+                continue
+            page.fill("#txtPassword", PASSWORD if PASSWORD is not None else "")
+            arm_login_outcome(page)
+            started = time.time()
+            if handle_captcha(page, attempt):
+                outcome, error_text = wait_for_login_outcome(page)
+            else:
+                outcome, error_text = "unsolved", None
+            elapsed = time.time() - started
+            attempts.append({"attempt": attempt + 1, "outcome": outcome, "seconds": round(elapsed, 2)})
+            print(f"Login attempt {attempt + 1}: {outcome} after {elapsed:.2f}s")
+            attempt += 1
+
+            if outcome == "dashboard":
+                state = "SUCCESS"
+            elif outcome == "error":
+                print(f"Login error: {error_text}")
+                state = "SUBMIT"
+            elif outcome == "captcha":
+                print("CAPTCHA verification failed.")
+                state = "SUBMIT"
+            elif outcome == "unsolved":
+                state = "REFRESH_CAPTCHA"
+            elif page.url.startswith(LOGIN_URL):
+                print("Login status unclear, refreshing CAPTCHA.")
+                state = "REFRESH_CAPTCHA"
+            else:
+                print(f"Login status unclear. URL: {page.url}")
+                state = "OPEN"
+
+        elif state == "REFRESH_CAPTCHA":
+            refresh_button = page.locator("#MainContent_btnRefreshCaptcha")
+            if refresh_button.count() > 0 and refresh_button.is_visible():
+                print("Refreshing CAPTCHA image...")
+                arm_login_outcome(page)
+                refresh_button.click()
+                outcome, _ = wait_for_login_outcome(page, timeout=10000)
+                state = "SUCCESS" if outcome == "dashboard" else "SUBMIT"
+            elif page.url.startswith(LOGIN_URL):
+                print("No CAPTCHA refresh button found.")
+                state = "SUBMIT"
+            else:
+                state = "OPEN"
+
+        elif state == "SUCCESS":
+            print(f"Login success. URL: {page.url}")
+            return True, attempts
+
+        else:
+            return False, attempts
+
 def sanitize_filename(name):
     if not isinstance(name, str):
         name = str(name)
@@ -105,600 +276,1355 @@ def sanitize_filename(name):
         return "sanitized_file"
     return name[:150]
 
-def parse_indonesian_date(date_str):
-    month_map = {
-        'Januari': 'January', 'Februari': 'February', 'Maret': 'March',
-        'April': 'April', 'Mei': 'May', 'Juni': 'June',
-        'Juli': 'July', 'Agustus': 'August', 'September': 'September',
-        'Oktober': 'October', 'November': 'November', 'Desember': 'December'
-    }
+def load_tugas_index():
+    tugas_index = TugasIndex(STATE_FILE)
+    print(f"Loaded tugas index with {len(tugas_index)} entries")
+    return tugas_index
+
+def expire_tugas_index(tugas_index, course_info_list):
+    """Forgets tugas from semesters that are no longer on the courses list."""
+    removed = tugas_index.expire({c.get("tahun_ajaran") for c in course_info_list if c})
+    if removed:
+        print(f"Expired {removed} tugas index entries from past semesters")
 
+def _read_rss_kb(pid):
     try:
-        date_match = re.search(r'(\d{1,2})\s+([A-Za-z]+)\s+(\d{4})', date_str)
-        if date_match:
-            day = date_match.group(1)
-            id_month = date_match.group(2)
-            year = date_match.group(3)
-            
-            if id_month in month_map:
-                en_month = month_map[id_month]
-                date_obj = datetime.strptime(f"{day} {en_month} {year}", "%d %B %Y")
-                return date_obj
-    except Exception as e:
-        print(f"Date parsing error: {e}")
-    return None
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
 
-def load_tugas_state():
-    if os.path.exists(STATE_FILE):
+def _child_pids():
+    """Maps each pid to its children, read from /proc (Linux only)."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
         try:
-            with open(STATE_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
+            with open(f"/proc/{entry}/stat", 'r') as f:
+                # The command name may contain spaces, so split after its closing paren.
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
 
-def save_tugas_state(state):
+def _process_name(pid):
     try:
-        with open(STATE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(state, f, ensure_ascii=False, indent=4)
-    except Exception as e:
-        print(f"Error saving tugas state: {e}")
+        with open(f"/proc/{pid}/comm", 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return ""
 
-def run_scraper():
-    # Load tugas state
-    tugas_state = load_tugas_state()
-    print(f"Loaded tugas state with {len(tugas_state)} entries")
-    
-    with sync_playwright() as p:
-        base_data_dir = os.path.join(os.getcwd(), "scraped_data")
-        if not os.path.exists(base_data_dir):
-            os.makedirs(base_data_dir)
-        print(f"Created data directory: {base_data_dir}")
-
-        # Add browser context for download handling
-        browser = p.firefox.launch(headless=True)
-        context = browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/115.0",
-            accept_downloads=True  # Enable downloads to handle them properly
-        )
-        page = context.new_page()
+def get_memory_usage():
+    """
+    Returns (python_rss_mb, browser_rss_mb). The browser figure sums the
+    processes under the Playwright node driver (not the driver itself), so
+    parse pool workers and other Python children are not counted. Values are
+    None where /proc is not available.
+    """
+    if not os.path.isdir("/proc"):
+        return None, None
+    python_rss = _read_rss_kb(os.getpid())
+    children = _child_pids()
+    browser_rss = 0
+    stack = [pid for driver in children.get(os.getpid(), []) if _process_name(driver) == "node"
+             for pid in children.get(driver, [])]
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        browser_rss += _read_rss_kb(pid)
+    return round(python_rss / 1024, 1), round(browser_rss / 1024, 1)
 
-        # List to store downloaded files for cleanup
-        downloaded_files = []
+# Logical pages the scraper moves between, as identified by their table header.
+PAGE_COURSE_LIST = "course_list"
+PAGE_COURSE_DETAIL = "course_detail"
+PAGE_TUGAS_UPLOAD = "tugas_upload"
+
+class PageStateTracker:
+    """
+    Remembers which logical page the browser is on so the table header does
+    not have to be read before every pertemuan. The state is set after each
+    navigation the scraper performs itself and is dropped on any main-frame
+    navigation (framenavigated), so the DOM is only probed when it is unknown.
+    """
+
+    def __init__(self):
+        self.state = None
+        self.course_index = None
+        self.probes = 0
+        self.avoided_probes = 0
+        self.invalidations = 0
 
+    def attach(self, page):
+        self.invalidate()
+        page.on("framenavigated", lambda frame: frame == page.main_frame and self.invalidate())
+
+    def invalidate(self):
+        if self.state is not None:
+            self.invalidations += 1
+        self.state = None
+        self.course_index = None
+
+    def mark(self, state, course_index=None):
+        self.state = state
+        self.course_index = course_index
+
+    def is_on(self, state, course_index=None):
+        """True if the cached state already answers the question (counts as an avoided probe)."""
+        if self.state == state and (course_index is None or self.course_index == course_index):
+            self.avoided_probes += 1
+            return True
+        return False
+
+    def current(self, page):
+        """Returns the known state, probing the page only when it is unknown."""
+        if self.state is not None:
+            self.avoided_probes += 1
+            return self.state
+        return self.probe(page)
+
+    def probe(self, page):
+        """Reads the first table header to work out where we are."""
+        self.probes += 1
+        thead_text = ""
+        if page.url.startswith(SSO_BASE_URL):
+            # Redirected to the login page: the session is gone, whatever the DOM shows
+            self.state = None
+            return None
         try:
-            print(f"Navigating to login page: {LOGIN_URL}")
-            page.goto(LOGIN_URL, timeout=60000)
-            page.fill("#txtUsername", USERNAME if USERNAME is not None else "")
+            thead = page.locator("table thead tr").first
+            thead_text = (thead.text_content(timeout=5000) or "").replace("\n", " ").strip().upper()
+        except Exception:
+            pass
+        if "PERTEMUAN" in thead_text and "AKTIVITAS PEMBELAJARAN" in thead_text:
+            state = PAGE_COURSE_DETAIL
+        elif "NO" in thead_text and "KODE" in thead_text and "MATA KULIAH" in thead_text:
+            state = PAGE_COURSE_LIST
+        elif "NIM" in thead_text and "NAMA" in thead_text and "WAKTU UNGGAH" in thead_text:
+            state = PAGE_TUGAS_UPLOAD
+        else:
+            state = None
+        # A probe cannot tell which course a detail page belongs to; callers mark that.
+        self.state = state
+        return state
 
-            login_success = False
-            for attempt in range(MAX_CAPTCHA_ATTEMPTS):
-                page.fill("#txtPassword", PASSWORD if PASSWORD is not None else "")
-
-                if not handle_captcha(page, attempt):
-                    if attempt < MAX_CAPTCHA_ATTEMPTS - 1:
-                        print("Retrying CAPTCHA...")
-                        time.sleep(2)
-                        if page.url.startswith(LOGIN_URL) and page.locator("#txtCaptcha").is_visible(timeout=1000):
-                            try:
-                                refresh_button = page.locator("#MainContent_btnRefreshCaptcha")
-                                if refresh_button.is_visible(timeout=1000):
-                                    print("Refreshing CAPTCHA image...")
-                                    refresh_button.click()
-                                    time.sleep(1)
-                            except Exception:
-                                print("No CAPTCHA refresh button found.")
-                            continue
-                        else:
-                            if (page.url.startswith(SIA_BASE_URL) and "default.aspx" in page.url.lower()) or \
-                               (page.url.startswith(SSO_BASE_URL) and "default.aspx" in page.url.lower()):
-                                login_success = True
-                                break
-                            else:
-                                print("Not on CAPTCHA page after Gemini failure. Stopping retries.")
-                                break
-                    else:
-                        print("Max CAPTCHA attempts reached.")
-                        break
+    def stats(self):
+        return {
+            "probes": self.probes,
+            "avoided_probes": self.avoided_probes,
+            "invalidations": self.invalidations
+        }
 
-                try:
-                    print("Waiting for page reaction...")
-                    page.wait_for_url(
-                        lambda url: not url.startswith(LOGIN_URL) or "default.aspx" in url.lower(),
-                        timeout=15000
-                    )
-                    if (page.url.startswith(SIA_BASE_URL) and "default.aspx" in page.url.lower()) or \
-                       (page.url.startswith(SSO_BASE_URL) and "default.aspx" in page.url.lower()):
-                        login_success = True
-                        print(f"Login success. URL: {page.url}")
-                        break
-                    else:
-                        error_message_locator = page.locator("#MainContent_lblMessage[style*='color:Red']")
-                        try:
-                            error_message_locator.wait_for(state="visible", timeout=1000)
-                            is_visible = True
-                        except PlaywrightTimeoutError:
-                            is_visible = False
-                        if is_visible:
-                            error_text = error_message_locator.text_content(timeout=1000)
-                            if error_text:
-                                error_text = error_text.lower()
-                            print(f"Login error: {error_text}")
-                        else:
-                            try:
-                                page.locator("#txtCaptcha").wait_for(state="visible", timeout=1000)
-                                is_captcha_visible = True
-                            except PlaywrightTimeoutError:
-                                is_captcha_visible = False
-                            if is_captcha_visible:
-                                print("CAPTCHA verification failed.")
-                            else:
-                                print(f"Login status unclear. URL: {page.url}")
-
-                except PlaywrightTimeoutError:
-                    print("Timeout waiting for URL change.")
-                    error_message_locator = page.locator("#MainContent_lblMessage[style*='color:Red']")
-                    try:
-                        error_message_locator.wait_for(state="visible", timeout=1000)
-                        is_visible = True
-                    except PlaywrightTimeoutError:
-                        is_visible = False
-                    if is_visible:
-                        error_text = error_message_locator.text_content(timeout=1000)
-                        if error_text:
-                            error_text = error_text.lower()
-                        print(f"Login error: {error_text}")
-                    else:
-                        try:
-                            page.locator("#txtCaptcha").wait_for(state="visible", timeout=1000)
-                            is_captcha_visible = True
-                        except PlaywrightTimeoutError:
-                            is_captcha_visible = False
-                        if is_captcha_visible:
-                            print("CAPTCHA verification failed.")
-                        else:
-                            print(f"Login status unclear after timeout. URL: {page.url}")
-                            if (page.url.startswith(SIA_BASE_URL) and "default.aspx" in page.url.lower()) or \
-                               (page.url.startswith(SSO_BASE_URL) and "default.aspx" in page.url.lower()):
-                                login_success = True
-                                break
-
-                if attempt < MAX_CAPTCHA_ATTEMPTS - 1 and not login_success:
-                    print("Retrying login...")
-                    try:
-                        page.locator("#txtCaptcha").wait_for(state="visible", timeout=1000)
-                        is_captcha_visible = True
-                    except PlaywrightTimeoutError:
-                        is_captcha_visible = False
-                    if page.url.startswith(LOGIN_URL) and is_captcha_visible:
-                        try:
-                            refresh_button = page.locator("#MainContent_btnRefreshCaptcha")
-                            try:
-                                refresh_button.wait_for(state="visible", timeout=1000)
-                                refresh_button.click()
-                                time.sleep(1)
-                            except PlaywrightTimeoutError:
-                                pass
-                        except Exception:
-                            pass
-                    elif not page.url.startswith(LOGIN_URL):
-                        page.goto(LOGIN_URL, timeout=30000)
-                        page.fill("#txtUsername", USERNAME if USERNAME is not None else "")
-                    time.sleep(2)
-                elif login_success:
-                    break
-                else:
-                    print("Max login attempts reached.")
-                    break
-
-            if not login_success:
-                if not ((page.url.startswith(SIA_BASE_URL) and "default.aspx" in page.url.lower()) or \
-                        (page.url.startswith(SSO_BASE_URL) and "default.aspx" in page.url.lower())):
-                    page.screenshot(path="login_failure_final_page.png")
-                    print(f"Login failed. URL: {page.url}")
-                    browser.close()
-                    return
+def open_course_detail(page, tracker, course_index):
+    course_link = page.locator(f"#MainContent_gridData_linkDetail_{course_index}")
+    with page.expect_navigation(wait_until="networkidle", timeout=45000):
+        course_link.click()
+    # An expired session redirects the click to the SSO login page; fail rather
+    # than capture that page as the course
+    if tracker.probe(page) != PAGE_COURSE_DETAIL:
+        raise RuntimeError(f"Course {course_index} did not open a course detail page (landed on {page.url})")
+    tracker.mark(PAGE_COURSE_DETAIL, course_index)
+
+def goto_courses_list(page, tracker):
+    page.goto(COURSES_LIST_PAGE_URL, timeout=60000, wait_until="networkidle")
+    tracker.mark(PAGE_COURSE_LIST)
+
+def ensure_on_course_detail_page(page, tracker, course_index):
+    if tracker.is_on(PAGE_COURSE_DETAIL, course_index):
+        return True
+    state = tracker.probe(page)
+    if state == PAGE_COURSE_DETAIL:
+        tracker.mark(PAGE_COURSE_DETAIL, course_index)
+        return True
+    # If on courses list page, re-navigate to course detail
+    if state == PAGE_COURSE_LIST:
+        print("  Not on course detail page, re-navigating to course...")
+        open_course_detail(page, tracker, course_index)
+        return True
+    # If on any other page, reload courses list and re-navigate
+    print("  Not on expected page, reloading courses list and re-navigating...")
+    goto_courses_list(page, tracker)
+    open_course_detail(page, tracker, course_index)
+    return True
+
+class BrowserSession:
+    """
+    Owns the browser, context and page, and recycles the page or context when
+    the navigation count or browser memory passes its limit. Cookies are carried
+    over through the context's storage state, so the login session survives.
+    """
+
+    def __init__(self, playwright, resume=False):
+        self.browser = playwright.firefox.launch(headless=True)
+        self.context = None
+        self.page = None
+        self.navigations = 0
+        self.total_navigations = 0
+        self.last_navigation = time.time()
+        self.recycles = []
+        self.memory_samples = []
+        self.tracker = PageStateTracker()
+        self.forensics = FailureRecorder()
+        # Start from the cookies of the last successful login if asked to and available
+        self.resumed = resume and os.path.exists(SESSION_FILE)
+        self._new_context(storage_state=SESSION_FILE if self.resumed else None)
 
-            print("\nLogin successful!")
-            print(f"Current URL: {page.url}")
+    def _new_context(self, storage_state=None):
+        self.context = self.browser.new_context(
+            user_agent=USER_AGENT,
+            accept_downloads=True,  # Enable downloads to handle them properly
+            storage_state=storage_state
+        )
+        self._new_page()
 
-            print("Looking for 'Sistem Informasi Akademik' link...")
-            sia_link = page.locator("a:has-text('Sistem Informasi Akademik')")
-            sia_link.wait_for(state="visible", timeout=15000)
-            print("Clicking link...")
-            sia_link.click()
+    def _new_page(self):
+        self.page = self.context.new_page()
+        self.navigations = 0
+        page = self.page
+        page.on("framenavigated", lambda frame: self._on_navigated(page, frame))
+        self.tracker.attach(page)
+        self.forensics.attach(page)
 
-            print("Looking for 'Login sebagai MAHASISWA' link...")
-            mahasiswa_login_link = page.locator("a:has-text('Login sebagai MAHASISWA')")
-            mahasiswa_login_link.wait_for(state="visible", timeout=15000)
-            print("Clicking link...")
-            with page.expect_navigation(timeout=30000, wait_until="networkidle"):
-                mahasiswa_login_link.click()
+    def _on_navigated(self, page, frame):
+        if frame == page.main_frame:
+            self.navigations += 1
+            self.total_navigations += 1
+            self.last_navigation = time.time()
 
-            print(f"Navigated to student dashboard. URL: {page.url}")
+    def sample_memory(self, label):
+        python_rss, browser_rss = get_memory_usage()
+        sample = {
+            "label": label,
+            "python_rss_mb": python_rss,
+            "browser_rss_mb": browser_rss,
+            "navigations": self.navigations
+        }
+        self.memory_samples.append(sample)
+        print(f"  Memory: python {python_rss} MB, browser {browser_rss} MB, {self.navigations} navigations on this page")
+        return sample
 
-            print("Navigating to 'Pelaksanaan Perkuliahan' section...")
-            pelaksanaan_perkuliahan_header = page.locator("a:has-text('Pelaksanaan Perkuliahan')")
-            aktivitas_pembelajaran_link = page.locator("a:has-text('– Aktivitas Pembelajaran')")
+    def maybe_recycle(self, return_url):
+        """
+        Recycles after a unit of work if a limit was crossed. Memory pressure
+        replaces the whole context; a high navigation count only the page.
+        Returns True if the page object changed.
+        """
+        sample = self.memory_samples[-1] if self.memory_samples else {}
+        browser_rss = sample.get("browser_rss_mb")
+        if browser_rss is not None and browser_rss > MAX_BROWSER_RSS_MB:
+            reason = f"browser RSS {browser_rss} MB > {MAX_BROWSER_RSS_MB} MB"
+            kind = "context"
+        elif self.navigations > MAX_NAVIGATIONS_PER_PAGE:
+            reason = f"{self.navigations} navigations > {MAX_NAVIGATIONS_PER_PAGE}"
+            kind = "page"
+        else:
+            return False
 
+        print(f"  Recycling browser {kind} ({reason})...")
+        old_context, old_page = self.context, self.page
+        if kind == "context":
+            storage_state = old_context.storage_state()
+            self._new_context(storage_state=storage_state)
             try:
-                aktivitas_pembelajaran_link.wait_for(state="visible", timeout=5000)
-                is_aktivitas_visible = True
-            except PlaywrightTimeoutError:
-                is_aktivitas_visible = False
-            if not is_aktivitas_visible:
-                print("Expanding section...")
-                pelaksanaan_perkuliahan_header.click()
-                page.wait_for_timeout(1000)
-
-            print("Clicking '– Aktivitas Pembelajaran'...")
-            aktivitas_pembelajaran_link.wait_for(state="visible", timeout=10000)
-            with page.expect_navigation(wait_until="networkidle", timeout=30000):
-                 aktivitas_pembelajaran_link.click()
-
-            print(f"On courses list page. URL: {page.url}")
-
-            # Extract course information
-            print("\nExtracting course information...")
-            course_rows = page.locator("#MainContent_gridData tbody tr")
-            num_courses = course_rows.count()
-            print(f"Found {num_courses} courses")
-
-            course_info_list = []
-            for i in range(num_courses):
-                row = course_rows.nth(i)
-                try:
-                    kode_mk = row.locator("td").nth(5).text_content()
-                    kode_mk = kode_mk.strip() if kode_mk else ""
-                    nama_mk = row.locator("td").nth(6).text_content()
-                    nama_mk = nama_mk.strip() if nama_mk else ""
-                    dosen = row.locator("td").nth(1).text_content()
-                    dosen = dosen.replace('\n', ', ').strip() if dosen else ""
-                    kelas = row.locator("td").nth(2).text_content()
-                    kelas = kelas.strip() if kelas else ""
-                    tahun_ajaran = row.locator("td").nth(3).text_content()
-                    tahun_ajaran = tahun_ajaran.strip() if tahun_ajaran else ""
-                    
-                    course_info = {
-                        "kode": kode_mk,
-                        "nama": nama_mk,
-                        "dosen": dosen,
-                        "kelas": kelas,
-                        "tahun_ajaran": tahun_ajaran
-                    }
-                    course_info_list.append(course_info)
-                    print(f"  Course {i+1}: {kode_mk} - {nama_mk}")
-                except Exception as e:
-                    print(f"Error extracting course info for row {i}: {e}")
-                    course_info_list.append({})
+                old_context.close()
+            except Exception:
+                pass
+        else:
+            self._new_page()
+            try:
+                old_page.close()
+            except Exception:
+                pass
+        self.page.goto(return_url, timeout=60000, wait_until="networkidle")
+        if return_url == COURSES_LIST_PAGE_URL:
+            self.tracker.mark(PAGE_COURSE_LIST)
+        after_rss = get_memory_usage()[1]
+        self.recycles.append({
+            "kind": kind,
+            "reason": reason,
+            "after_label": sample.get("label"),
+            "browser_rss_mb_before": browser_rss,
+            "browser_rss_mb_after": after_rss
+        })
+        print(f"  Recycled. Browser RSS now {after_rss} MB. URL: {self.page.url}")
+        return True
 
-            # Save courses list
-            courses_json_path = os.path.join(base_data_dir, "courses_list.json")
-            with open(courses_json_path, 'w', encoding='utf-8') as f:
-                json.dump(course_info_list, f, ensure_ascii=False, indent=4)
-            print(f"Saved courses list to: {courses_json_path}")
+    def memory_summary(self):
+        python_values = [s["python_rss_mb"] for s in self.memory_samples if s["python_rss_mb"] is not None]
+        browser_values = [s["browser_rss_mb"] for s in self.memory_samples if s["browser_rss_mb"] is not None]
+        return {
+            "peak_python_rss_mb": max(python_values) if python_values else None,
+            "peak_browser_rss_mb": max(browser_values) if browser_values else None,
+            "recycles": self.recycles,
+            "samples": self.memory_samples
+        }
 
-            # Process each course
-            for i in range(num_courses):
-                current_course_link = page.locator(f"#MainContent_gridData_linkDetail_{i}")
-                course_info = course_info_list[i]
-                course_name_full = f"{course_info.get('kode', '')}-{course_info.get('nama', '')}" if course_info else f"Course_Index_{i}"
+    def save_state(self):
+        """Stores the session cookies so the next run can skip the CAPTCHA login."""
+        try:
+            self.context.storage_state(path=SESSION_FILE)
+        except Exception as e:
+            print(f"Error saving session state: {e}")
+
+    def close(self):
+        try:
+            self.context.close()
+            self.browser.close()
+        except:
+            pass
+
+def write_run_summary(base_data_dir, summary):
+    print("\n--- Run Summary ---")
+    memory = summary.get("memory", {})
+    print(f"Courses processed: {summary.get('courses_processed', 0)}")
+    print(f"Peak Python RSS: {memory.get('peak_python_rss_mb')} MB")
+    print(f"Peak browser RSS: {memory.get('peak_browser_rss_mb')} MB")
+    print(f"Browser recycles: {len(memory.get('recycles', []))}")
+    page_state = summary.get("page_state")
+    if page_state:
+        print(f"Page-state probes: {page_state['probes']} (avoided {page_state['avoided_probes']})")
+    summary_path = os.path.join(base_data_dir, RUN_SUMMARY_FILE)
+    try:
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=4)
+        print(f"Saved run summary to: {summary_path}")
+    except Exception as e:
+        print(f"Error saving run summary: {e}")
+
+def get_data_dir():
+    base_data_dir = os.path.join(os.getcwd(), "scraped_data")
+    if not os.path.exists(base_data_dir):
+        os.makedirs(base_data_dir)
+    print(f"Created data directory: {base_data_dir}")
+    return base_data_dir
+
+def course_display_name(course_info, course_index):
+    return f"{course_info.get('kode', '')}-{course_info.get('nama', '')}" if course_info else f"Course_Index_{course_index}"
+
+def course_json_path(base_data_dir, course_info, course_index):
+    return os.path.join(base_data_dir, f"{sanitize_filename(course_display_name(course_info, course_index))}.json")
+
+def navigate_to_courses_list(page, tracker):
+    """From the SSO dashboard, follows the links down to the 'Aktivitas Pembelajaran' courses list."""
+    print("Looking for 'Sistem Informasi Akademik' link...")
+    sia_link = page.locator("a:has-text('Sistem Informasi Akademik')")
+    sia_link.wait_for(state="visible", timeout=15000)
+    print("Clicking link...")
+    sia_link.click()
+
+    print("Looking for 'Login sebagai MAHASISWA' link...")
+    mahasiswa_login_link = page.locator("a:has-text('Login sebagai MAHASISWA')")
+    mahasiswa_login_link.wait_for(state="visible", timeout=15000)
+    print("Clicking link...")
+    with page.expect_navigation(timeout=30000, wait_until="networkidle"):
+        mahasiswa_login_link.click()
+
+    print(f"Navigated to student dashboard. URL: {page.url}")
+
+    print("Navigating to 'Pelaksanaan Perkuliahan' section...")
+    pelaksanaan_perkuliahan_header = page.locator("a:has-text('Pelaksanaan Perkuliahan')")
+    aktivitas_pembelajaran_link = page.locator("a:has-text('– Aktivitas Pembelajaran')")
+
+    try:
+        aktivitas_pembelajaran_link.wait_for(state="visible", timeout=5000)
+        is_aktivitas_visible = True
+    except PlaywrightTimeoutError:
+        is_aktivitas_visible = False
+    if not is_aktivitas_visible:
+        print("Expanding section...")
+        pelaksanaan_perkuliahan_header.click()
+        page.wait_for_timeout(1000)
+
+    print("Clicking '– Aktivitas Pembelajaran'...")
+    aktivitas_pembelajaran_link.wait_for(state="visible", timeout=10000)
+    with page.expect_navigation(wait_until="networkidle", timeout=30000):
+         aktivitas_pembelajaran_link.click()
+    tracker.mark(PAGE_COURSE_LIST)
+
+    print(f"On courses list page. URL: {page.url}")
+
+def start_logged_in_session(session):
+    """
+    Opens the courses list, reusing the saved session when it is still valid
+    and logging in otherwise. Returns the login attempts ([] when the saved
+    session was reused), or None if login failed.
+    """
+    page = session.page
+    if session.resumed:
+        if session_is_alive(page, session.tracker):
+            print(f"Resumed saved session from {SESSION_FILE}; skipping login.")
+            return []
+        session.resumed = False
+
+    login_success, login_attempts = login(page)
+    if not login_success:
+        print(f"Login failed. URL: {page.url}")
+        session.forensics.dump("login", "login failed", page)
+        return None
+
+    print("\nLogin successful!")
+    print(f"Current URL: {page.url}")
+    navigate_to_courses_list(page, session.tracker)
+    session.save_state()
+    return login_attempts
+
+def page_html(page, forensics=None):
+    """The current page's HTML, also handed to the forensics buffer so it never fetches the DOM itself."""
+    html = page.content()
+    if forensics:
+        forensics.note_dom(html)
+    return html
+
+def capture_page(page, store, identity, meta=None, forensics=None):
+    """Stores the current page's HTML and returns it."""
+    html = page_html(page, forensics)
+    store.capture(identity, html, meta)
+    return html
+
+def extract_course_info_list(page, store, forensics=None):
+    print("\nExtracting course information...")
+    html = page_html(page, forensics)
+    # Parsed before storing, like the detail page: a login page raises here
+    course_info_list = parse_course_list(html)
+    store.capture(course_list_identity(), html)
+    print(f"Found {len(course_info_list)} courses")
+    for i, course_info in enumerate(course_info_list):
+        if course_info:
+            print(f"  Course {i+1}: {course_info['kode']} - {course_info['nama']}")
+        else:
+            print(f"Error extracting course info for row {i}")
+    return course_info_list
+
+def save_courses_list(base_data_dir, course_info_list):
+    courses_json_path = os.path.join(base_data_dir, "courses_list.json")
+    write_json(courses_json_path, course_info_list)
+    print(f"Saved courses list to: {courses_json_path}")
+
+def pertemuan_rows(page):
+    return page.locator("#MainContent_gridDetail tbody tr")
 
-                course_name_sanitized = sanitize_filename(course_name_full)
-                print(f"\nProcessing Course {i+1}/{num_courses}: {course_name_full}")
+def capture_course_detail(page, tracker, i, course_info, store, forensics=None):
+    """
+    Captures the course detail page of course i and returns its parsed rows
+    (see html_parse.parse_course_detail). The page is parsed before it is
+    stored, so a page without the pertemuan grid raises and never replaces
+    the last good capture.
+    """
+    ensure_on_course_detail_page(page, tracker, i)
+    html = page_html(page, forensics)
+    rows = parse_course_detail(html, SIA_BASE_URL, sanitize_filename)
+    store.capture(course_detail_identity(course_id(course_info, i)), html,
+                  {"course_index": i, "course_info": course_info})
+    return rows
 
-                course_data = {
-                    "course_info": course_info,
-                    "pertemuan": {}
-                }
+def scrape_tugas_page(page, tracker, i, j, link_index, store, tid, forensics=None):
+    """
+    Opens the 'Pengumpulan Tugas' link at link_index in pertemuan row j of
+    course i, captures the upload page and returns to the course detail page.
+    Returns the captured HTML, or None if the upload page never appeared.
 
-                def ensure_on_course_detail_page(page, course_index):
-                    # Check if on course detail page by thead
-                    thead_text = ""
+    With a FailureRecorder, a failed first attempt is dumped and the retries
+    are traced; the trace is kept only if they fail too.
+    """
+    unit = f"tugas {tid}"
+    error = None
+    traced = False
+    for attempt in range(3):
+        if attempt == 1 and forensics:
+            forensics.dump(unit, "first attempt failed", page, error)
+            traced = forensics.start_trace(page.context, unit)
+        try:
+            ensure_on_course_detail_page(page, tracker, i)
+            tugas_link = pertemuan_rows(page).nth(j).locator("td:nth-child(2) a").nth(link_index)
+            pages_before = set([p for p in page.context.pages])
+            tugas_link.click()
+            page.wait_for_timeout(2000 + attempt * 1000)
+            pages_after = set([p for p in page.context.pages])
+            new_tabs = list(pages_after - pages_before)
+            if new_tabs:
+                print("        New tab opened by click. Closing it.")
+                for tab in new_tabs:
                     try:
-                        thead = page.locator("table thead tr").first
-                        thead_text = (thead.text_content() or "").replace("\n", " ").strip().upper()
+                        tab.close()
                     except Exception:
                         pass
-                    if "PERTEMUAN" in thead_text and "AKTIVITAS PEMBELAJARAN" in thead_text:
-                        return True
-                    # If on courses list page, re-navigate to course detail
-                    if "NO" in thead_text and "KODE" in thead_text and "MATA KULIAH" in thead_text:
-                        print("  Not on course detail page, re-navigating to course...")
-                        course_link = page.locator(f"#MainContent_gridData_linkDetail_{course_index}")
-                        with page.expect_navigation(wait_until="networkidle", timeout=45000):
-                            course_link.click()
-                        return True
-                    # If on any other page, reload courses list and re-navigate
-                    print("  Not on expected page, reloading courses list and re-navigating...")
-                    page.goto(COURSES_LIST_PAGE_URL, timeout=60000, wait_until="networkidle")
-                    course_link = page.locator(f"#MainContent_gridData_linkDetail_{course_index}")
-                    with page.expect_navigation(wait_until="networkidle", timeout=45000):
-                        course_link.click()
-                    return True
-
-                print(f"  Opening course details...")
-                with page.expect_navigation(wait_until="networkidle", timeout=45000):
-                    current_course_link.click()
-                print(f"  On course activities page. URL: {page.url}")
-
-                # Ensure on course detail page before scraping pertemuan
-                ensure_on_course_detail_page(page, i)
-
-                print("  Scraping pertemuan data...")
-                pertemuan_rows_locator = page.locator("#MainContent_gridDetail tbody tr")
-                num_pertemuan = pertemuan_rows_locator.count()
-                print(f"  Found {num_pertemuan} pertemuan")
-
-                for j in range(num_pertemuan):
-                    try:
-                        # Always ensure on course detail page before each pertemuan
-                        ensure_on_course_detail_page(page, i)
-                        row = pertemuan_rows_locator.nth(j)
-                        pertemuan_key = f"Pertemuan_{j+1}"
-                        try:
-                            pertemuan_info_cell = row.locator("td").nth(0)
-                            if pertemuan_info_cell.is_visible():
-                                pertemuan_info_text = pertemuan_info_cell.text_content()
-                                pertemuan_info_text = pertemuan_info_text.strip() if pertemuan_info_text else ""
-                                lines = [line.strip() for line in pertemuan_info_text.split('\n') if line.strip()]
-                                if lines:
-                                    pertemuan_key = lines[0].split('(')[0].strip()
-                                    # Search all lines for a date pattern (e.g., 'Jumat, 25 April 2025')
-                                    pertemuan_date_raw = None
-                                    pertemuan_date_iso = None
-                                    for line in lines:
-                                        date_match = re.search(r'\d{1,2} [A-Za-z]+ \d{4}', line)
-                                        if date_match:
-                                            pertemuan_date_raw = line
-                                            try:
-                                                date_obj = parse_indonesian_date(date_match.group(0))
-                                                if date_obj:
-                                                    pertemuan_date_iso = date_obj.isoformat()
-                                            except Exception as e:
-                                                print(f"    Error parsing pertemuan date: {e}")
-                                            break
-                        except Exception as e:
-                            print(f"    Error getting pertemuan info: {e}")
-
-                        sanitized_pertemuan_key = sanitize_filename(pertemuan_key)
-                        print(f"    Processing: {sanitized_pertemuan_key}")
-
-                        pertemuan_data = {"files": [], "tugas": []}
-                        # Add date info to pertemuan_data
-                        pertemuan_data["date_raw"] = [pertemuan_date_raw] if 'pertemuan_date_raw' in locals() and pertemuan_date_raw is not None else []
-                        pertemuan_data["date_iso"] = [pertemuan_date_iso] if 'pertemuan_date_iso' in locals() and pertemuan_date_iso is not None else []
-
-                        # Scrape files and tugas with robust error handling
-                        pertemuan_links = row.locator("td:nth-child(2) a")
-                        files_scraped = set()
-                        pengumpulan_links = []
-                        for k in range(pertemuan_links.count()):
-                            link = pertemuan_links.nth(k)
-                            text = (link.text_content() or "").upper()
-                            # Scrape [TUGAS] and [BAHAN AJAR] links as file metadata (do not click)
-                            if "[TUGAS]" in text or "[BAHAN AJAR]" in text:
-                                try:
-                                    href = link.get_attribute('href')
-                                    download_filename = link.get_attribute('download') or "unknown_filename"
-                                    title = link.text_content()
-                                    title = title.strip() if title else ""
-                                    full_url = f"{SIA_BASE_URL}{href}" if href and not href.startswith("http") else href
-                                    file_key = (download_filename, title, full_url)
-                                    if file_key not in files_scraped:
-                                        pertemuan_data["files"].append({
-                                            "filename_suggested": download_filename,
-                                            "title": title,
-                                            "url": full_url
-                                        })
-                                        files_scraped.add(file_key)
-                                except Exception as e:
-                                    print(f"      Error scraping file link: {e}")
-                            # Only click Pengumpulan Tugas links
-                            elif "PENGUMPULAN TUGAS" in text:
-                                pengumpulan_links.append(link)
-                        # Try all pengumpulan tugas links robustly
-                        if pengumpulan_links:
-                            print(f"      Found {len(pengumpulan_links)} 'Pengumpulan Tugas' links. Scraping tugas...")
-                            for idx, tugas_link in enumerate(pengumpulan_links):
-                                pengumpulan_title = (tugas_link.text_content() or "").strip()
-                                
-                                # Generate unique key for tugas state
-                                tugas_key = f"{course_name_sanitized}_{sanitized_pertemuan_key}_{sanitize_filename(pengumpulan_title)}"
-                                
-                                # Check if tugas is known to be inactive
-                                if tugas_key in tugas_state and not tugas_state[tugas_key]:
-                                    print(f"        Skipping tugas (inactive from previous run): {pengumpulan_title}")
-                                    continue
-                                    
-                                for attempt in range(3):
-                                    try:
-                                        pages_before = set([p for p in tugas_link.page.context.pages])
-                                        tugas_link.click()
-                                        page.wait_for_timeout(2000 + attempt * 1000)
-                                        pages_after = set([p for p in tugas_link.page.context.pages])
-                                        new_tabs = list(pages_after - pages_before)
-                                        if new_tabs:
-                                            print("        New tab opened by click. Closing it.")
-                                            for tab in new_tabs:
-                                                try:
-                                                    tab.close()
-                                                except Exception:
-                                                    pass
-                                            continue
-                                        thead_text = ""
-                                        try:
-                                            thead = page.locator("table thead tr").first
-                                            thead_text = (thead.text_content() or "").replace("\n", " ").strip().upper()
-                                        except Exception:
-                                            pass
-                                        if not page.url.startswith(COURSES_LIST_PAGE_URL):
-                                            print("        Redirected away from course page. Reloading and retrying...")
-                                            page.goto(COURSES_LIST_PAGE_URL, timeout=60000, wait_until="networkidle")
-                                            ensure_on_course_detail_page(page, i)
-                                            pertemuan_rows_locator = page.locator("#MainContent_gridDetail tbody tr")
-                                            row = pertemuan_rows_locator.nth(j)
-                                            pertemuan_links = row.locator("td:nth-child(2) a")
-                                            tugas_link = pertemuan_links.nth(idx)
-                                            continue
-                                        if "NIM" in thead_text and "NAMA" in thead_text and "WAKTU UNGGAH" in thead_text:
-                                            print(f"        On pengumpulan tugas (upload) page. Scraping details... (attempt {attempt+1})")
-                                            tugas_cards = page.locator(".card")
-                                            for card_idx in range(tugas_cards.count()):
-                                                card = tugas_cards.nth(card_idx)
-                                                try:
-                                                    header = card.locator(".card-header").text_content() or ""
-                                                    header = header.strip()
-                                                    deadline_text = ""
-                                                    deadline_span = card.locator("span[style*='color: red']")
-                                                    if deadline_span.count() > 0:
-                                                        deadline_text = deadline_span.first.text_content() or ""
-                                                        deadline_text = deadline_text.strip()
-                                                    is_active = False
-                                                    if deadline_text:
-                                                        deadline_date = parse_indonesian_date(deadline_text)
-                                                        if deadline_date and deadline_date > datetime.now():
-                                                            is_active = True
-                                                    # Update tugas state
-                                                    tugas_state[tugas_key] = is_active
-                                                    
-                                                    pertemuan_data["tugas"].append({
-                                                        "pengumpulan_title": pengumpulan_title,
-                                                        "title": header,
-                                                        "deadline": deadline_text,
-                                                        "active": is_active
-                                                    })
-                                                except Exception as e:
-                                                    print(f"          Error scraping tugas card: {e}")
-                                            kembali_btn = page.locator("#MainContent_btnCancelTugas")
-                                            if kembali_btn.is_visible():
-                                                print("        Returning to pertemuan list by pressing 'Kembali'...")
-                                                with page.expect_navigation(wait_until="networkidle", timeout=30000):
-                                                    kembali_btn.click()
-                                            else:
-                                                print("        'Kembali' button not found. Navigating back.")
-                                                page.go_back()
-                                            break
-                                        else:
-                                            print(f"        Tugas page/modal not detected after click (attempt {attempt+1}). Retrying...")
-                                    except Exception as e:
-                                        print(f"        Error clicking tugas link: {e}. Retrying...")
-                        
-                        # Save pertemuan data
-                        course_data["pertemuan"][sanitized_pertemuan_key] = pertemuan_data
+                continue
+            if not page.url.startswith(COURSES_LIST_PAGE_URL):
+                print("        Redirected away from course page. Reloading and retrying...")
+                goto_courses_list(page, tracker)
+                continue
+            # The click is meant to change the page, so the cached state cannot answer this
+            if tracker.probe(page) == PAGE_TUGAS_UPLOAD:
+                print(f"        On pengumpulan tugas (upload) page. Capturing... (attempt {attempt+1})")
+                html = capture_page(page, store, tugas_page_identity(tid), forensics=forensics)
+                kembali_btn = page.locator("#MainContent_btnCancelTugas")
+                if kembali_btn.is_visible():
+                    print("        Returning to pertemuan list by pressing 'Kembali'...")
+                    with page.expect_navigation(wait_until="networkidle", timeout=30000):
+                        kembali_btn.click()
+                    tracker.mark(PAGE_COURSE_DETAIL, i)
+                else:
+                    print("        'Kembali' button not found. Navigating back.")
+                    page.go_back()
+                if traced:
+                    forensics.stop_trace(keep=False)
+                return html
+            else:
+                print(f"        Tugas page/modal not detected after click (attempt {attempt+1}). Retrying...")
+        except Exception as e:
+            error = e
+            print(f"        Error clicking tugas link: {e}. Retrying...")
+    if forensics:
+        trace_path = forensics.stop_trace(keep=True) if traced else None
+        forensics.dump(unit, "tugas page did not open", page, error, trace_path)
+    return None
 
-                    except Exception as e:
-                        print(f"Error at course {i}, pertemuan {j}: {e}")
-                        traceback.print_exc()
-                        # Continue to next pertemuan instead of crashing
-                        continue
+def return_to_courses_list(page, tracker):
+    back_button = page.locator("#MainContent_btnCancelDetail")
+    if back_button.is_visible():
+        print("  Returning to courses list...")
+        with page.expect_navigation(wait_until="networkidle", timeout=30000):
+            back_button.click()
+        tracker.mark(PAGE_COURSE_LIST)
+    else:
+        print("  'Kembali' button not found. Re-navigating.")
+        goto_courses_list(page, tracker)
 
-                # Save course data
-                json_filename = f"{course_name_sanitized}.json"
-                json_filepath = os.path.join(base_data_dir, json_filename)
-                print(f"  Saving course data to {json_filepath}")
-                try:
-                    with open(json_filepath, 'w', encoding='utf-8') as f:
-                        json.dump(course_data, f, ensure_ascii=False, indent=4)
-                except Exception as e:
-                    print(f"  ERROR saving JSON: {e}")
+def save_course_output(base_data_dir, course_info, i, course):
+    json_filepath = course_json_path(base_data_dir, course_info, i)
+    print(f"  Saving course data to {json_filepath}")
+    course_data = course.to_dict()
+    try:
+        write_json(json_filepath, course_data)
+    except Exception as e:
+        print(f"  ERROR saving JSON: {e}")
+    return course_data
 
-                # Save tugas state after each course
-                save_tugas_state(tugas_state)
-                print(f"  Saved tugas state with {len(tugas_state)} entries")
+def record_tugas(tugas_index, tid, tugas_list, course_info, pid, pengumpulan_title):
+    """Records freshly verified tugas in the index and reports what changed."""
+    change = tugas_index.record(tid, tugas_list, course_of(pid), pid, pengumpulan_title,
+                                course_info.get("tahun_ajaran", ""))
+    if change:
+        print(f"        {pengumpulan_title}: {change}")
 
-                # Navigate back
-                back_button = page.locator("#MainContent_btnCancelDetail")
-                if back_button.is_visible():
-                    print("  Returning to courses list...")
-                    with page.expect_navigation(wait_until="networkidle", timeout=30000):
-                        back_button.click()
-                else:
-                    print("  'Kembali' button not found. Re-navigating.")
-                    page.goto(COURSES_LIST_PAGE_URL, timeout=60000, wait_until="networkidle")
+def build_course_from_store(store_path, course_index, course_info):
+    """
+    Builds a course from its captured detail page and the latest capture of
+    each of its tugas pages. Runs in the parse pool, so it only touches the
+    store. Returns (course_index, course_info, course_data, tugas) where tugas
+    maps tugas ID to (pertemuan ID, pengumpulan title, tugas dicts).
+    """
+    store = HtmlStore(store_path)
+    html = store.load(course_detail_identity(course_id(course_info, course_index)))
+    if html is None:
+        return course_index, course_info, None, {}
+    try:
+        rows = parse_course_detail(html, SIA_BASE_URL, sanitize_filename)
+    except ValueError as e:
+        # Never overwrite a course's output with an empty one
+        print(f"  Captured detail page of course {course_index} is unusable: {e}")
+        return course_index, course_info, None, {}
+    cid = course_id(course_info, course_index)
+    course = Course(info=CourseInfo.from_dict(course_info))
+    tugas = {}
+    for pertemuan_data, pengumpulan in rows:
+        pid = pertemuan_id(cid, pertemuan_data.key)
+        for link_index, pengumpulan_title, href in pengumpulan:
+            tid = tugas_id(pid, href, pengumpulan_title)
+            tugas_html = store.load(tugas_page_identity(tid))
+            if tugas_html is None:
+                continue
+            tugas_list = parse_tugas_page(tugas_html)
+            for t in tugas_list:
+                t.id = tid
+                t.pengumpulan_title = pengumpulan_title
+            pertemuan_data.tugas.extend(tugas_list)
+            tugas[tid] = (pid, pengumpulan_title, [t.to_dict() for t in tugas_list])
+        course.add_pertemuan(pertemuan_data)
+    return course_index, course_info, course.to_dict(), tugas
 
-            # --- START: NEW CODE TO AGGREGATE ALL COURSE DATA ---
-            print("\nAggregating all course data into a single file...")
-            all_courses_data = []
-            for course_info in course_info_list:
-                course_name_full = f"{course_info.get('kode', '')}-{course_info.get('nama', '')}" if course_info else ""
-                if not course_name_full:
-                    continue # Skip if course info was empty
+def finish_course(result, tugas_index, base_data_dir, verified=(), keep_files=False):
+    """
+    Writes a course built by build_course_from_store() and records the tugas
+    that were opened this run (`verified`) in the index. With keep_files, file
+    links are taken from the existing output (scrape --tugas-only).
+    """
+    i, course_info, course_data, tugas = result
+    if course_data is None:
+        print(f"  No captured detail page for {course_display_name(course_info, i)}; skipping.")
+        return None
+    course = Course.from_dict(course_data)
+    if keep_files:
+        existing_data, _ = load_course_output(base_data_dir, course_info, i)
+        existing = Course.from_dict(existing_data) if existing_data else None
+        for key, pertemuan in course.pertemuan.items():
+            if existing and key in existing.pertemuan:
+                pertemuan.files = existing.pertemuan[key].files
+    for tid in verified:
+        if tid in tugas:
+            pid, pengumpulan_title, tugas_dicts = tugas[tid]
+            record_tugas(tugas_index, tid, [Tugas.from_dict(t) for t in tugas_dicts], course_info, pid,
+                         pengumpulan_title)
+    return save_course_output(base_data_dir, course_info, i, course)
 
-                json_filename = f"{sanitize_filename(course_name_full)}.json"
-                json_filepath = os.path.join(base_data_dir, json_filename)
+def capture_pertemuan_tugas(page, tracker, i, j, pertemuan_data, pengumpulan, cid, tugas_index, store,
+                            forensics=None):
+    """Opens the tugas pages of one pertemuan row that are worth opening. Returns their IDs."""
+    verified = []
+    print(f"    Processing: {pertemuan_data.key}")
+    if pengumpulan:
+        print(f"      Found {len(pengumpulan)} 'Pengumpulan Tugas' links. Capturing tugas...")
+    pid = pertemuan_id(cid, pertemuan_data.key)
+    for link_index, pengumpulan_title, href in pengumpulan:
+        tid = tugas_id(pid, href, pengumpulan_title)
 
-                if os.path.exists(json_filepath):
-                    try:
-                        with open(json_filepath, 'r', encoding='utf-8') as f:
-                            course_data_content = json.load(f)
-                            all_courses_data.append(course_data_content)
-                            print(f"  Added {json_filename} to aggregation")
-                    except Exception as e:
-                        print(f"  Error reading {json_filename}: {e}")
-                else:
-                    print(f"  Warning: Expected file {json_filename} not found. Skipping.")
+        # Inactive tugas are only reopened when their re-verification is due
+        scrape, reason = tugas_index.should_scrape(tid)
+        if not scrape:
+            print(f"        Skipping tugas (inactive, verified recently): {pengumpulan_title}")
+            tugas_index.seen(tid)
+            continue
+
+        if scrape_tugas_page(page, tracker, i, j, link_index, store, tid, forensics) is not None:
+            verified.append(tid)
+    return verified
+
+def scrape_course(page, tracker, i, course_info, tugas_index, store, num_courses, pertemuan_range=None,
+                  forensics=None):
+    """
+    Captures one course starting from the courses list: its detail page and
+    the tugas pages worth opening, then returns to the courses list. Parsing
+    is left to build_course_from_store(). Returns the tugas IDs opened.
+
+    pertemuan_range (a set of 1-based row numbers) limits which rows' tugas
+    pages are opened; other rows keep their earlier tugas captures. A
+    pertemuan that fails is retried once under forensics (see forensics.py)
+    and skipped if it fails again.
+    """
+    course_name_full = course_display_name(course_info, i)
+    cid = course_id(course_info, i)
+    print(f"\nProcessing Course {i+1}/{num_courses}: {course_name_full}")
+
+    print(f"  Opening course details...")
+    open_course_detail(page, tracker, i)
+    print(f"  On course activities page. URL: {page.url}")
+
+    rows = capture_course_detail(page, tracker, i, course_info, store, forensics)
+    print(f"  Found {len(rows)} pertemuan")
+
+    verified = []
+    for j, (pertemuan_data, pengumpulan) in enumerate(rows):
+        if pertemuan_range and (j + 1) not in pertemuan_range:
+            continue
+        def capture():
+            return capture_pertemuan_tugas(page, tracker, i, j, pertemuan_data, pengumpulan, cid, tugas_index,
+                                           store, forensics)
+        try:
+            verified.extend(capture())
+        except Exception as e:
+            print(f"Error at course {i}, pertemuan {j}: {e}")
+            traceback.print_exc()
+            if forensics is None:
+                continue
+            tracker.invalidate()
+            try:
+                verified.extend(forensics.retry(f"pertemuan {pertemuan_id(cid, pertemuan_data.key)}", page,
+                                                capture, e))
+            except Exception as retry_error:
+                # Continue to next pertemuan instead of crashing
+                print(f"  Retry of course {i}, pertemuan {j} failed too: {retry_error}")
+                tracker.invalidate()
+
+    # Navigate back
+    return_to_courses_list(page, tracker)
+    return verified
+
+def scrape_course_with_retry(session, i, course_info, tugas_index, store, num_courses, pertemuan_range=None):
+    """
+    scrape_course() in a BrowserSession. A failed course is dumped and
+    retried once from the courses list with tracing; a second failure raises.
+    """
+    def scrape():
+        return scrape_course(session.page, session.tracker, i, course_info, tugas_index, store, num_courses,
+                             pertemuan_range=pertemuan_range, forensics=session.forensics)
+    try:
+        return scrape()
+    except Exception as e:
+        print(f"  Error scraping {course_display_name(course_info, i)}: {e}")
+        traceback.print_exc()
 
-            # Save the final aggregated data
-            final_json_path = os.path.join(base_data_dir, "courses_data.json")
+        def retry():
+            goto_courses_list(session.page, session.tracker)
+            return scrape()
+        return session.forensics.retry(f"course {course_id(course_info, i)}", session.page, retry, e)
+
+def archive_run(base_data_dir, all_courses_data):
+    """Adds this run's results to the deduplicated history (see history_store.py)."""
+    history = HistoryStore(os.path.join(base_data_dir, HISTORY_FILENAME))
+    try:
+        run_id, new_objects = history.archive(all_courses_data)
+        stats = history.stats()
+        print(f"Archived run {run_id} to history: {new_objects} new object(s), "
+              f"{stats['stored_bytes'] / 1024:.0f} KiB over {stats['runs']} run(s)")
+    finally:
+        history.close()
+
+def aggregate_course_data(course_info_list, base_data_dir, archive=False):
+    """
+    Combines the per-course JSON files into courses_data.json. With archive,
+    the result is also added to the history store (scrapes do this; rebuilds
+    from existing output do not).
+    """
+    print("\nAggregating all course data into a single file...")
+    all_courses_data = []
+    for course_info in course_info_list:
+        if not course_info:
+            continue # Skip if course info was empty
+
+        json_filepath = course_json_path(base_data_dir, course_info, None)
+        json_filename = os.path.basename(json_filepath)
+
+        if os.path.exists(json_filepath):
             try:
-                with open(final_json_path, 'w', encoding='utf-8') as f:
-                    json.dump(all_courses_data, f, ensure_ascii=False, indent=4)
-                print(f"Successfully aggregated {len(all_courses_data)} courses into: {final_json_path}")
+                all_courses_data.append(read_json(json_filepath))
+                print(f"  Added {json_filename} to aggregation")
             except Exception as e:
-                print(f"  ERROR saving final aggregated JSON: {e}")
-            # --- END: NEW CODE TO AGGREGATE ALL COURSE DATA ---
+                print(f"  Error reading {json_filename}: {e}")
+        else:
+            print(f"  Warning: Expected file {json_filename} not found. Skipping.")
+
+    # Save the final aggregated data
+    final_json_path = os.path.join(base_data_dir, "courses_data.json")
+    try:
+        write_json(final_json_path, all_courses_data)
+        print(f"Successfully aggregated {len(all_courses_data)} courses into: {final_json_path}")
+    except Exception as e:
+        print(f"  ERROR saving final aggregated JSON: {e}")
+
+    # Small precomputed views for the extension (summary + per-course shards)
+    try:
+        write_views(all_courses_data, base_data_dir, parse_deadline=parse_deadline)
+    except Exception as e:
+        print(f"  ERROR writing consumer views: {e}")
+
+    if archive:
+        try:
+            archive_run(base_data_dir, all_courses_data)
+        except Exception as e:
+            print(f"  ERROR archiving run to history: {e}")
+    return all_courses_data
+
+def cleanup_run_files(downloaded_files):
+    # Clean up downloaded files
+    for file_path in downloaded_files:
+        if os.path.exists(file_path):
+            try:
+                os.remove(file_path)
+                print(f"Deleted downloaded file: {file_path}")
+            except Exception as e:
+                print(f"Error deleting downloaded file: {e}")
+    
+    if os.path.exists("captcha.png"):
+        try:
+            os.remove("captcha.png")
+        except OSError as e:
+            print(f"Error removing captcha.png: {e}")
+
+def course_matches(course_info, course_filters):
+    """True if a course's kode (exact) or nama (substring) matches any filter, case-insensitively."""
+    kode = (course_info.get("kode") or "").lower()
+    nama = (course_info.get("nama") or "").lower()
+    return any(f.lower() == kode or f.lower() in nama for f in course_filters)
+
+def parse_pertemuan_range(text):
+    """Parses '3', '3-5' or '1,4-6' into a set of 1-based pertemuan row numbers."""
+    rows = set()
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            rows.update(range(int(start), int(end) + 1))
+        else:
+            rows.add(int(part))
+    if not rows:
+        raise ValueError(f"Empty pertemuan range: {text!r}")
+    return rows
+
+def open_parse_pool():
+    """
+    Process pool for build_course_from_store(). Spawned rather than forked so
+    the children do not inherit the browser connection.
+    """
+    return ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+def finish_parsed_courses(pending, tugas_index, base_data_dir, keep_files=False, wait=False):
+    """Writes the courses the pool has finished, in order. Returns those still being parsed."""
+    while pending and (wait or pending[0][0].done()):
+        future, verified = pending.pop(0)
+        finish_course(future.result(), tugas_index, base_data_dir, verified, keep_files)
+        tugas_index.save()
+    return pending
+
+def run_scraper(course_filters=None, pertemuan_range=None, tugas_only=False, resume=True):
+    """
+    Scrapes every course, or only those matching course_filters. With
+    resume, the saved session is reused when still valid so no CAPTCHA
+    (and no Gemini) is needed. The browser only captures pages; a process
+    pool parses each captured course while the browser moves on.
+    """
+    tugas_index = load_tugas_index()
+
+    with load_playwright()() as p:
+        base_data_dir = get_data_dir()
+        store = HtmlStore(os.path.join(base_data_dir, HTML_STORE_DIRNAME))
+        pool = open_parse_pool()
+        pending = []
+
+        # Browser, context and page live in a session so they can be recycled mid-run
+        session = BrowserSession(p, resume=resume)
+        page = session.page
+        tracker = session.tracker
+        run_started = time.time()
+        courses_processed = 0
+
+        # List to store downloaded files for cleanup
+        downloaded_files = []
+
+        try:
+            login_attempts = start_logged_in_session(session)
+            if login_attempts is None:
+                return
+
+            course_info_list = extract_course_info_list(page, store, session.forensics)
+            save_courses_list(base_data_dir, course_info_list)
+            expire_tugas_index(tugas_index, course_info_list)
+            num_courses = len(course_info_list)
+
+            # Process each course
+            for i in range(num_courses):
+                if course_filters and not course_matches(course_info_list[i], course_filters):
+                    continue
+                verified = scrape_course_with_retry(session, i, course_info_list[i], tugas_index, store, num_courses,
+                                                    pertemuan_range=pertemuan_range)
+                pending.append((pool.submit(build_course_from_store, store.path, i, course_info_list[i]), verified))
+                pending = finish_parsed_courses(pending, tugas_index, base_data_dir, keep_files=tugas_only)
+                courses_processed += 1
+
+                # Track memory per course and recycle the page/context if it has grown too much
+                session.sample_memory(course_display_name(course_info_list[i], i))
+                if session.maybe_recycle(COURSES_LIST_PAGE_URL):
+                    page = session.page
+
+            finish_parsed_courses(pending, tugas_index, base_data_dir, keep_files=tugas_only, wait=True)
+            aggregate_course_data(course_info_list, base_data_dir, archive=True)
+            if not course_filters and not pertemuan_range:
+                removed, kept_bytes = store.prune()
+                print(f"HTML store: {kept_bytes / 1024:.0f} KiB kept, {removed} stale capture(s) removed")
+
+            write_run_summary(base_data_dir, {
+                "finished_at": datetime.now().isoformat(),
+                "duration_seconds": round(time.time() - run_started, 1),
+                "courses_processed": courses_processed,
+                "login_attempts": login_attempts,
+                "page_state": tracker.stats(),
+                "memory": session.memory_summary(),
+                "forensics": session.forensics.dumps
+            })
 
             print("\nFinished processing all courses!")
 
         except Exception as e:
             print(f"\nCritical error in scraper: {str(e)}")
             traceback.print_exc()
-            try:
-                page.screenshot(path="critical_error_page.png")
-            except Exception as se:
-                print(f"Could not take screenshot: {se}")
+            # A course whose retry failed has already been dumped
+            if session.forensics.last_error is not e:
+                session.forensics.dump("run", "crashed", session.page, e)
             # Re-raise to trigger restart
             raise
 
         finally:
-            # Clean up downloaded files
-            for file_path in downloaded_files:
-                if os.path.exists(file_path):
+            pool.shutdown(cancel_futures=True)
+            cleanup_run_files(downloaded_files)
+            print("\nClosing browser...")
+            session.close()
+            print("Browser closed. Process completed.")
+
+def run_reparse():
+    """Rebuilds every course JSON and courses_data.json from the captured HTML, without a browser."""
+    base_data_dir = get_data_dir()
+    store = HtmlStore(os.path.join(base_data_dir, HTML_STORE_DIRNAME))
+    html = store.load(course_list_identity())
+    if html is None:
+        print(f"ERROR: no captured courses list in {store.path}. Run a scrape first.")
+        return False
+    course_info_list = parse_course_list(html)
+    save_courses_list(base_data_dir, course_info_list)
+
+    tugas_index = load_tugas_index()
+    started = time.time()
+    with open_parse_pool() as pool:
+        futures = [pool.submit(build_course_from_store, store.path, i, course_info)
+                   for i, course_info in enumerate(course_info_list)]
+        for future in futures:
+            finish_course(future.result(), tugas_index, base_data_dir)
+    print(f"Reparsed {len(course_info_list)} course(s) in {time.time() - started:.1f}s")
+    aggregate_course_data(course_info_list, base_data_dir)
+    return True
+
+# --- Daemon mode ---
+
+def next_active_deadline(course_data, now=None):
+    """Nearest future tugas deadline in a course's scraped data, or None."""
+    now = now or datetime.now()
+    deadlines = []
+    for pertemuan in (course_data or {}).get("pertemuan", {}).values():
+        for tugas in pertemuan.get("tugas", []):
+            deadline = parse_deadline(tugas.get("deadline", ""))
+            if deadline and deadline > now:
+                deadlines.append(deadline)
+    return min(deadlines) if deadlines else None
+
+def load_course_output(base_data_dir, course_info, course_index):
+    """Returns (course_data, modified_time) of an existing course JSON, or (None, None)."""
+    path = course_json_path(base_data_dir, course_info, course_index)
+    try:
+        return read_json(path), datetime.fromtimestamp(os.path.getmtime(path))
+    except (OSError, ValueError):
+        return None, None
+
+def session_is_alive(page, tracker):
+    """Reloads the courses list; False if the server sent us back to the login page."""
+    try:
+        goto_courses_list(page, tracker)
+    except Exception as e:
+        print(f"Session check failed: {e}")
+        return False
+    if page.url.startswith(SSO_BASE_URL) or not page.url.startswith(COURSES_LIST_PAGE_URL):
+        print(f"Session expired (landed on {page.url}).")
+        tracker.invalidate()
+        return False
+    return True
+
+def run_daemon(max_idle_seconds=600):
+    """
+    Long-running mode: keeps one logged-in browser session and re-scrapes
+    courses according to their nearest tugas deadline (see scheduler.py),
+    within SCHEDULER_REQUESTS_PER_HOUR navigations per rolling hour. Every
+    scraped course is written out and re-aggregated immediately.
+    """
+    from scheduler import CourseSchedule, RequestBudget, COLD_INTERVAL_MINUTES, FAILURE_BACKOFF_MINUTES
+
+    tugas_index = load_tugas_index()
+    schedule = CourseSchedule()
+    budget = RequestBudget()
+
+    with load_playwright()() as p:
+        base_data_dir = get_data_dir()
+        store = HtmlStore(os.path.join(base_data_dir, HTML_STORE_DIRNAME))
+        session = BrowserSession(p, resume=True)
+        try:
+            if start_logged_in_session(session) is None:
+                return
+
+            def ensure_logged_in():
+                """Trusts the courses list on screen only if it was loaded recently; else checks (and logs in)."""
+                idle = time.time() - session.last_navigation
+                if idle < DAEMON_SESSION_CHECK_MINUTES * 60 and session.tracker.is_on(PAGE_COURSE_LIST) \
+                        and session.page.url.startswith(COURSES_LIST_PAGE_URL):
+                    return
+                if not session_is_alive(session.page, session.tracker):
+                    session.tracker.invalidate()
+                    if start_logged_in_session(session) is None:
+                        raise RuntimeError("Re-login failed in daemon mode")
+
+            def refresh_courses():
+                """Re-reads the courses list (the page must be on it) and registers new courses."""
+                course_info_list = extract_course_info_list(session.page, store, session.forensics)
+                save_courses_list(base_data_dir, course_info_list)
+                expire_tugas_index(tugas_index, course_info_list)
+                now = datetime.now()
+                keys = {}
+                for i, course_info in enumerate(course_info_list):
+                    key = sanitize_filename(course_display_name(course_info, i))
+                    keys[key] = i
+                    course_data, modified = load_course_output(base_data_dir, course_info, i)
+                    schedule.seed(key, next_active_deadline(course_data, modified), modified)
+                    schedule.ensure(key, now)
+                schedule.save()
+                return course_info_list, keys
+
+            course_info_list, keys = refresh_courses()
+            # The courses list itself changes rarely (new semester, added class), so it is
+            # re-read about as often as a course without deadlines
+            courses_refresh_seconds = COLD_INTERVAL_MINUTES * 60
+            courses_refreshed = time.time()
+
+            while True:
+                if time.time() - courses_refreshed >= courses_refresh_seconds:
+                    navigations_before = session.total_navigations
                     try:
-                        os.remove(file_path)
-                        print(f"Deleted downloaded file: {file_path}")
+                        ensure_logged_in()
+                        course_info_list, keys = refresh_courses()
+                        courses_refreshed = time.time()
                     except Exception as e:
-                        print(f"Error deleting downloaded file: {e}")
-            
-            if os.path.exists("captcha.png"):
+                        print(f"  Refreshing the courses list failed: {e}")
+                        traceback.print_exc()
+                        session.tracker.invalidate()
+                        # Try again after the failure backoff rather than on every loop
+                        courses_refreshed = time.time() - courses_refresh_seconds + FAILURE_BACKOFF_MINUTES * 60
+                    budget.spend(session.total_navigations - navigations_before)
+
+                now = datetime.now()
+                due = schedule.due(now, keys)
+                if not due:
+                    wait = (schedule.next_wakeup(now, keys) - now).total_seconds()
+                    wait = min(max(wait, 1), max_idle_seconds)
+                    print(f"\nNothing due. Sleeping {wait:.0f}s (budget used: {budget.used()}/{budget.per_hour} this hour)...")
+                    time.sleep(wait)
+                    continue
+
+                key = due[0]
+                cost = schedule.cost(key)
+                wait = budget.seconds_until_available(cost)
+                if wait > 0:
+                    print(f"\nRequest budget exhausted. Waiting {wait:.0f}s before {key}...")
+                    time.sleep(min(wait, max_idle_seconds))
+                    continue
+
+                i = keys[key]
+                # Counted from here so the liveness check and any re-login are charged too
+                navigations_before = session.total_navigations
+                try:
+                    # Keep the warm session; the previous course left the page on the courses list
+                    ensure_logged_in()
+                    verified = scrape_course_with_retry(session, i, course_info_list[i], tugas_index, store,
+                                                        len(course_info_list))
+                    # One course at a time, so parse in-process rather than through the pool
+                    course_data = finish_course(build_course_from_store(store.path, i, course_info_list[i]),
+                                                tugas_index, base_data_dir, verified)
+                except Exception as e:
+                    # One bad course or network blip must not end the daemon
+                    print(f"  Scraping {key} failed: {e}")
+                    traceback.print_exc()
+                    session.tracker.invalidate()
+                    budget.spend(session.total_navigations - navigations_before)
+                    backoff = schedule.record_failure(key, datetime.now())
+                    schedule.save()
+                    print(f"  Retrying {key} in {backoff.total_seconds() / 60:.0f} min")
+                    continue
+
+                tugas_index.save()
+                cost = session.total_navigations - navigations_before
+                budget.spend(cost)
+
+                next_deadline = next_active_deadline(course_data)
+                schedule.record(key, datetime.now(), next_deadline, cost)
+                schedule.save()
+                print(f"  Next refresh of {key} at {schedule.entries[key]['next_due']}"
+                      f" (nearest deadline: {next_deadline}, {cost} navigations)")
+
+                aggregate_course_data(course_info_list, base_data_dir, archive=True)
+
+                # Recycling navigates too, so a blip here must not end the daemon either
+                navigations_before = session.total_navigations
                 try:
-                    os.remove("captcha.png")
-                except OSError as e:
-                    print(f"Error removing captcha.png: {e}")
+                    session.sample_memory(key)
+                    session.maybe_recycle(COURSES_LIST_PAGE_URL)
+                except Exception as e:
+                    print(f"  Browser recycle failed: {e}")
+                    traceback.print_exc()
+                    session.tracker.invalidate()
+                budget.spend(session.total_navigations - navigations_before)
+        finally:
+            cleanup_run_files([])
             print("\nClosing browser...")
-            try:
-                context.close()
-                browser.close()
-            except:
-                pass
-            print("Browser closed. Process completed.")
+            session.close()
 
-if __name__ == "__main__":
-    if not USERNAME or not PASSWORD:
-        print("ERROR: USERNAME or PASSWORD not set in environment.")
-        print("Create a .env file with these variables.")
-        exit(1)
-    if not GEMINI_API_KEY:
-        print("WARNING: GEMINI_API_KEY not set. CAPTCHA solving will be skipped.")
+# --- Queue mode ---
+
+# Lower runs first: finish the tugas of a course before opening new courses,
+# so a course's results are complete as early as possible.
+QUEUE_PRIORITY_TUGAS = 0
+QUEUE_PRIORITY_COURSE = 1
+QUEUE_POLL_SECONDS = 5
+
+def handle_queue_task(session, task, tugas_index, store):
+    """
+    Runs one queued task in a logged-in session. Returns (result, children)
+    where children are follow-up tasks for WorkQueue.complete().
+    """
+    page = session.page
+    tracker = session.tracker
+    payload = task.payload
+
+    if task.kind == "course_list":
+        if not tracker.is_on(PAGE_COURSE_LIST):
+            goto_courses_list(page, tracker)
+        course_info_list = extract_course_info_list(page, store, session.forensics)
+        course_filters = payload.get("course_filters")
+        children = [
+            ("course", f"course:{i}", {"course_index": i, "course_info": course_info}, QUEUE_PRIORITY_COURSE)
+            for i, course_info in enumerate(course_info_list)
+            if not course_filters or course_matches(course_info, course_filters)
+        ]
+        return {"course_info_list": course_info_list}, children
+
+    i = payload["course_index"]
+    course_info = payload["course_info"]
+    cid = course_id(course_info, i)
+
+    if task.kind == "course":
+        # The whole detail page is parsed from one capture, so pertemuan rows
+        # need no tasks of their own; only tugas pages need the browser again.
+        print(f"\nCourse {i+1}: {course_display_name(course_info, i)}")
+        rows = capture_course_detail(page, tracker, i, course_info, store, session.forensics)
+        print(f"  Found {len(rows)} pertemuan")
+        children = []
+        skipped = []
+        for j, (pertemuan_data, pengumpulan) in enumerate(rows):
+            pid = pertemuan_id(cid, pertemuan_data.key)
+            for link_index, pengumpulan_title, href in pengumpulan:
+                tid = tugas_id(pid, href, pengumpulan_title)
+                scrape, reason = tugas_index.should_scrape(tid)
+                if not scrape:
+                    print(f"        Skipping tugas (inactive, verified recently): {pengumpulan_title}")
+                    skipped.append(tid)
+                    continue
+                children.append((
+                    "tugas", f"tugas:{i}:{j}:{link_index}",
+                    {"course_index": i, "course_info": course_info, "row": j, "link_index": link_index,
+                     "pertemuan_id": pid, "pengumpulan_title": pengumpulan_title, "tugas_id": tid},
+                    QUEUE_PRIORITY_TUGAS
+                ))
+        pertemuan = [[p.key, p.to_dict()] for p, _ in rows]
+        return {"pertemuan": pertemuan, "skipped_tugas": skipped}, children
+
+    if task.kind == "tugas":
+        html = scrape_tugas_page(page, tracker, i, payload["row"], payload["link_index"], store, payload["tugas_id"],
+                                 session.forensics)
+        if html is None:
+            # Raising leaves the task to be retried (possibly by another worker)
+            raise RuntimeError(f"Tugas page did not open for {payload['tugas_id']}")
+        tugas_list = parse_tugas_page(html)
+        for tugas in tugas_list:
+            tugas.id = payload["tugas_id"]
+            tugas.pengumpulan_title = payload["pengumpulan_title"]
+        return [t.to_dict() for t in tugas_list], ()
+
+    raise ValueError(f"Unknown task kind: {task.kind}")
+
+def run_queue_init(queue_path, course_filters=None):
+    """Empties the queue and seeds it with the courses-list task."""
+    queue = WorkQueue(queue_path)
+    queue.reset()
+    queue.enqueue("course_list", "course_list", {"course_filters": course_filters}, QUEUE_PRIORITY_COURSE)
+    queue.close()
+    print(f"Initialised work queue {queue_path}")
+
+def run_queue_worker(queue_path, worker_id=None):
+    """
+    Claims and runs tasks until the queue has no pending or leased work left.
+    Each worker has its own browser and session; any number can run at once.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue = WorkQueue(queue_path)
+    # Read-only here: the coordinator records the results in the index
+    tugas_index = load_tugas_index()
+    store = HtmlStore(os.path.join(get_data_dir(), HTML_STORE_DIRNAME))
+    done = 0
+    failed = 0
+
+    with load_playwright()() as p:
+        session = BrowserSession(p, resume=True)
+        try:
+            if start_logged_in_session(session) is None:
+                return False
+            while True:
+                task = queue.claim(worker_id)
+                if task is None:
+                    if queue.is_complete():
+                        break
+                    time.sleep(QUEUE_POLL_SECONDS)
+                    continue
+
+                print(f"\n[{worker_id}] {task.kind} {task.key} (attempt {task.attempts})")
+                # A task that failed before (here or on another worker) runs traced
+                traced = task.attempts > 1 and session.forensics.start_trace(session.page.context, task.key)
+                try:
+                    # A redirect to SSO means the session died; log in again before blaming the task
+                    if session.tracker.current(session.page) is None and not session_is_alive(session.page, session.tracker):
+                        if start_logged_in_session(session) is None:
+                            raise RuntimeError("Re-login failed in queue worker")
+                    result, children = handle_queue_task(session, task, tugas_index, store)
+                except Exception as e:
+                    print(f"  Task {task.key} failed: {e}")
+                    traceback.print_exc()
+                    trace_path = session.forensics.stop_trace(keep=True) if traced else None
+                    session.forensics.dump(task.key, f"attempt {task.attempts} failed", session.page, e, trace_path)
+                    session.tracker.invalidate()
+                    if queue.fail(task, e):
+                        print(f"  Giving up on {task.key} after {task.attempts} attempts.")
+                    failed += 1
+                    continue
+
+                if traced:
+                    session.forensics.stop_trace(keep=False)
+                if queue.complete(task, result, children):
+                    done += 1
+                else:
+                    print(f"  {task.key} was already completed by another worker; discarding.")
+
+                session.sample_memory(task.key)
+                session.maybe_recycle(COURSES_LIST_PAGE_URL)
+        finally:
+            queue.close()
+            print("\nClosing browser...")
+            session.close()
+
+    print(f"Worker {worker_id} finished: {done} task(s) done, {failed} failure(s).")
+    return True
+
+def assemble_queue_output(queue, base_data_dir):
+    """
+    Builds the course JSONs, courses_list.json, the tugas index and
+    courses_data.json from the finished tasks.
+    """
+    list_results = queue.results("course_list")
+    if not list_results:
+        print("ERROR: the courses list task has not finished.")
+        return False
+    course_info_list = list_results[0][1]["course_info_list"]
+    save_courses_list(base_data_dir, course_info_list)
+    tugas_index = load_tugas_index()
+    expire_tugas_index(tugas_index, course_info_list)
 
+    # Workers captured every page into the shared HTML store, so each course is
+    # built from there like a local scrape: tugas that were skipped as inactive,
+    # or whose task failed, keep their last captured data.
+    store = HtmlStore(os.path.join(base_data_dir, HTML_STORE_DIRNAME))
+    verified = {}
+    for payload, _ in queue.results("tugas"):
+        verified.setdefault(payload["course_index"], []).append(payload["tugas_id"])
+    for payload, result in queue.results("course"):
+        for tid in result.get("skipped_tugas", []):
+            tugas_index.seen(tid)
+        i = payload["course_index"]
+        finish_course(build_course_from_store(store.path, i, payload["course_info"]), tugas_index, base_data_dir,
+                      verified.get(i, ()))
+
+    tugas_index.save()
+    print(f"Saved tugas index with {len(tugas_index)} entries")
+    aggregate_course_data(course_info_list, base_data_dir, archive=True)
+    return True
+
+def run_queue_coordinator(queue_path):
+    """Waits until every task is done or failed, then assembles the output."""
+    queue = WorkQueue(queue_path)
+    try:
+        while not queue.is_complete():
+            counts = queue.counts()
+            print(f"Waiting for workers: {counts['pending']} pending, {counts['leased']} leased, "
+                  f"{counts['done']} done, {counts['failed']} failed")
+            time.sleep(QUEUE_POLL_SECONDS * 6)
+        for kind, key, attempts, error in queue.failures():
+            print(f"  FAILED {key} after {attempts} attempt(s): {error}")
+        return assemble_queue_output(queue, get_data_dir())
+    finally:
+        queue.close()
+
+def run_queue_status(queue_path):
+    queue = WorkQueue(queue_path)
+    try:
+        counts = queue.counts()
+        print(f"{queue_path}: " + ", ".join(f"{count} {status}" for status, count in counts.items()))
+        for kind, key, attempts, error in queue.failures():
+            print(f"  FAILED {key} after {attempts} attempt(s): {error}")
+        return queue.is_complete()
+    finally:
+        queue.close()
+
+def run_aggregate():
+    """Rebuilds courses_data.json and the consumer views from existing output, without a browser."""
+    base_data_dir = get_data_dir()
+    courses_json_path = os.path.join(base_data_dir, "courses_list.json")
+    if not os.path.exists(courses_json_path):
+        print(f"ERROR: {courses_json_path} not found. Run a scrape first.")
+        return False
+    aggregate_course_data(read_json(courses_json_path), base_data_dir)
+    return True
+
+def run_history(args):
+    """Answers questions about past runs from the history store, without a browser."""
+    history_path = os.path.join(os.getcwd(), "scraped_data", HISTORY_FILENAME)
+    if not os.path.exists(history_path):
+        print(f"No history yet ({history_path} not found).")
+        return False
+    history = HistoryStore(history_path)
+    try:
+        if args.query == "course":
+            when = None
+            if args.at:
+                when = datetime.fromisoformat(args.at)
+                # A bare date means "as of that day", so include the runs archived during it
+                if "T" not in args.at and " " not in args.at.strip():
+                    when = when.replace(hour=23, minute=59, second=59)
+            found = history.course_at(args.value, when)
+            if found is None:
+                print(f"No archived version of {args.value}" + (f" on or before {args.at}." if args.at else "."))
+                return False
+            taken_at, course = found
+            print(f"# {args.value} as of {args.at or 'now'} (version archived {taken_at})")
+            print(json.dumps(course, ensure_ascii=False, indent=2))
+        elif args.query == "tugas":
+            versions = history.tugas_history(args.value)
+            if not versions:
+                print(f"No tugas matching '{args.value}'.")
+                return False
+            previous_key = previous_deadline = None
+            for tugas_key, taken_at, title, deadline_iso, active in versions:
+                if tugas_key != previous_key:
+                    print(f"\n{title} ({tugas_key})")
+                    previous_key, previous_deadline = tugas_key, deadline_iso
+                    print(f"  {taken_at}: first seen, deadline {deadline_iso}, {'active' if active else 'closed'}")
+                    continue
+                change = f"deadline {previous_deadline} -> {deadline_iso}" if deadline_iso != previous_deadline else "changed"
+                print(f"  {taken_at}: {change}, {'active' if active else 'closed'}")
+                previous_deadline = deadline_iso
+        else:
+            for key, value in history.stats().items():
+                print(f"{key}: {value}")
+        return True
+    finally:
+        history.close()
+
+def run_validate_session():
+    """Checks whether the saved session still opens the courses list."""
+    if not os.path.exists(SESSION_FILE):
+        print(f"No saved session ({SESSION_FILE} not found).")
+        return False
+    with load_playwright()() as p:
+        session = BrowserSession(p, resume=True)
+        try:
+            alive = session_is_alive(session.page, session.tracker)
+        finally:
+            session.close()
+    print("Saved session is valid." if alive else "Saved session has expired.")
+    return alive
+
+def run_with_restarts(run):
     restarts = 0
     while restarts <= MAX_RESTARTS:
         try:
             print(f"\n{'='*50}")
             print(f"Starting scraper run (attempt {restarts+1}/{MAX_RESTARTS+1})")
             print(f"{'='*50}")
-            run_scraper()
+            run()
             print("Scraper completed successfully!")
             break
         except Exception as e:
@@ -723,3 +1649,90 @@ if __name__ == "__main__":
                     log_file.write(f"{'='*50}\n\n")
                 print("Error details saved to scraper_crash.log")
                 exit(1)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Scrape course data from the Astra Polytechnic SIA.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    scrape = subparsers.add_parser("scrape", help="Scrape courses (the default when no command is given).")
+    scrape.add_argument("-c", "--course", action="append", dest="courses", metavar="KODE",
+                        help="Only scrape this course (kode, or part of its name). Repeatable.")
+    scrape.add_argument("-p", "--pertemuan", type=parse_pertemuan_range, metavar="RANGE",
+                        help="Only scrape these pertemuan rows, e.g. '3', '3-5' or '1,4-6'.")
+    scrape.add_argument("--tugas-only", action="store_true",
+                        help="Only refresh tugas; keep file links from the existing output.")
+    scrape.add_argument("--fresh-login", action="store_true",
+                        help=f"Ignore the saved session in {SESSION_FILE} and log in again.")
+
+    subparsers.add_parser("aggregate", help="Rebuild courses_data.json and views from existing output.")
+    subparsers.add_parser("reparse", help="Rebuild all output from the captured HTML, without a browser.")
+
+    history = subparsers.add_parser("history", help="Query the archived results of past runs.")
+    history.add_argument("query", choices=["course", "tugas", "stats"],
+                         help="course: a course as it was on a date; tugas: how a tugas (key or title) changed; "
+                              "stats: size of the history.")
+    history.add_argument("value", nargs="?", help="Course kode, or text matching a tugas.")
+    history.add_argument("--at", metavar="DATE", help="With course: ISO date or datetime, e.g. 2025-04-25.")
+    subparsers.add_parser("validate-session", help="Check whether the saved session is still valid.")
+    subparsers.add_parser("daemon", help="Keep running and refresh courses by deadline urgency.")
+
+    queue = subparsers.add_parser("queue", help="Share a scrape between worker processes through a SQLite queue.")
+    queue.add_argument("action", choices=["init", "worker", "coordinate", "status"],
+                       help="init: seed the queue; worker: run tasks; coordinate: wait and assemble the output; "
+                            "status: show task counts.")
+    queue.add_argument("--queue-file", default=QUEUE_FILE, metavar="PATH",
+                       help=f"Queue database (default: {QUEUE_FILE}).")
+    queue.add_argument("-c", "--course", action="append", dest="courses", metavar="KODE",
+                       help="With init: only queue this course. Repeatable.")
+    queue.add_argument("--worker-id", help="With worker: name used for task leases (default: host-pid).")
+
+    # Plain `python Scraper.py [options]` keeps meaning a scrape
+    if not argv or argv[0] not in subparsers.choices and argv[0] not in ("-h", "--help"):
+        argv = ["scrape"] + list(argv)
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = parse_args(argv)
+
+    if args.command == "aggregate":
+        return 0 if run_aggregate() else 1
+    if args.command == "reparse":
+        return 0 if run_reparse() else 1
+    if args.command == "history":
+        if args.query != "stats" and not args.value:
+            print(f"ERROR: history {args.query} needs a value.")
+            return 1
+        return 0 if run_history(args) else 1
+    if args.command == "validate-session":
+        return 0 if run_validate_session() else 1
+    if args.command == "queue" and args.action == "init":
+        run_queue_init(args.queue_file, course_filters=args.courses)
+        return 0
+    if args.command == "queue" and args.action == "status":
+        return 0 if run_queue_status(args.queue_file) else 1
+    if args.command == "queue" and args.action == "coordinate":
+        return 0 if run_queue_coordinator(args.queue_file) else 1
+
+    if not USERNAME or not PASSWORD:
+        print("ERROR: USERNAME or PASSWORD not set in environment.")
+        print("Create a .env file with these variables.")
+        return 1
+    if not GEMINI_API_KEY:
+        print("WARNING: GEMINI_API_KEY not set. CAPTCHA solving will be skipped.")
+
+    if args.command == "daemon":
+        run_daemon()
+        return 0
+    if args.command == "queue":
+        return 0 if run_queue_worker(args.queue_file, worker_id=args.worker_id) else 1
+
+    run_with_restarts(lambda: run_scraper(
+        course_filters=args.courses,
+        pertemuan_range=args.pertemuan,
+        tugas_only=args.tugas_only,
+        resume=not args.fresh_login
+    ))
+    return 0
+
+if __name__ == "__main__":
+    exit(main(sys.argv[1:]))
@@ -0,0 +1,174 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+
+# Small precomputed views of the aggregated course data, written next to
+# courses_data.json so the extension does not have to walk every course,
+# pertemuan and tugas (and re-parse every deadline) each time the popup opens.
+#
+#   views/summary.json        active tugas sorted by deadline, upcoming pertemuan
+#                             sorted by date, and a manifest of the course shards
+#   views/course_<KODE>_<KELAS>.json  one shard per class offering (same shape as in
+#                             courses_data.json)
+#
+# File names are flat because the files are published to a Gist.
+
+VIEWS_DIRNAME = "views"
+SUMMARY_FILENAME = "summary.json"
+SHARD_PREFIX = "course_"
+
+
+def _compact(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+def _first(value):
+    """date_raw/date_iso are stored as one-element lists; accept plain strings too."""
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+def _safe(text):
+    return "".join(c for c in (text or "") if c.isalnum() or c in "-_")
+
+
+def _shard_id(course_info, index):
+    """kode alone is shared by the classes (kelas) of one course, so both are used."""
+    course_info = course_info or {}
+    kode = _safe(course_info.get("kode"))
+    if not kode:
+        return f"index_{index}"
+    kelas = _safe(course_info.get("kelas"))
+    return f"{kode}_{kelas}" if kelas else kode
+
+
+def tugas_key(course_info, pertemuan_key, tugas):
+    """Same key the extension uses for its checkmarks (getTugasKey in popup.js)."""
+    return f"{course_info.get('kode', '')}__{pertemuan_key}__{tugas.get('pengumpulan_title') or tugas.get('title')}"
+
+
+def _deadline_iso(tugas, parse_deadline):
+    if tugas.get("deadline_iso"):
+        return tugas["deadline_iso"]
+    if parse_deadline and tugas.get("deadline"):
+        deadline = parse_deadline(tugas["deadline"])
+        return deadline.isoformat() if deadline else None
+    return None
+
+
+def build_views(all_courses_data, now=None, parse_deadline=None):
+    """
+    Returns (summary, shards) for the aggregated data. `shards` maps file name
+    to course data; `summary` carries the views and a manifest with each
+    shard's sha1 and size so consumers can fetch only what changed.
+    """
+    now = now or datetime.now()
+    now_iso = now.isoformat()
+    today_iso = now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+    active_tugas = []
+    upcoming_pertemuan = []
+    shards = {}
+
+    for index, course in enumerate(all_courses_data):
+        course_info = (course or {}).get("course_info") or {}
+        if not course_info:
+            continue
+        shard_name = f"{SHARD_PREFIX}{_shard_id(course_info, index)}.json"
+        shards[shard_name] = course
+
+        for pertemuan_key, pertemuan in (course.get("pertemuan") or {}).items():
+            has_active_tugas = False
+            for tugas in pertemuan.get("tugas") or []:
+                deadline_iso = _deadline_iso(tugas, parse_deadline)
+                is_active = deadline_iso > now_iso if deadline_iso else bool(tugas.get("active"))
+                if not is_active or not tugas.get("pengumpulan_title"):
+                    continue
+                has_active_tugas = True
+                active_tugas.append({
+                    "key": tugas_key(course_info, pertemuan_key, tugas),
+                    "course_kode": course_info.get("kode", ""),
+                    "course_nama": course_info.get("nama", ""),
+                    "pertemuan": pertemuan_key,
+                    "pengumpulan_title": tugas.get("pengumpulan_title"),
+                    "title": tugas.get("title"),
+                    "deadline": tugas.get("deadline"),
+                    "deadline_iso": deadline_iso,
+                    "shard": shard_name
+                })
+
+            date_iso = _first(pertemuan.get("date_iso"))
+            if has_active_tugas or (date_iso and date_iso >= today_iso):
+                upcoming_pertemuan.append({
+                    "course_kode": course_info.get("kode", ""),
+                    "course_nama": course_info.get("nama", ""),
+                    "pertemuan": pertemuan_key,
+                    "date_raw": _first(pertemuan.get("date_raw")),
+                    "date_iso": date_iso,
+                    "has_active_tugas": has_active_tugas,
+                    "files": pertemuan.get("files") or [],
+                    "shard": shard_name
+                })
+
+    # Undated entries sort last.
+    active_tugas.sort(key=lambda t: (t["deadline_iso"] is None, t["deadline_iso"] or "", t["course_kode"]))
+    upcoming_pertemuan.sort(key=lambda p: (p["date_iso"] is None, p["date_iso"] or "", p["course_kode"]))
+
+    manifest = {}
+    for shard_name, course in shards.items():
+        encoded = _compact(course)
+        info = course.get("course_info") or {}
+        manifest[shard_name] = {
+            "kode": info.get("kode", ""),
+            "kelas": info.get("kelas", ""),
+            "nama": info.get("nama", ""),
+            "sha1": hashlib.sha1(encoded).hexdigest(),
+            "bytes": len(encoded)
+        }
+
+    summary = {
+        "generated_at": now_iso,
+        "active_tugas": active_tugas,
+        "upcoming_pertemuan": upcoming_pertemuan,
+        "shards": manifest
+    }
+    return summary, shards
+
+
+def write_views(all_courses_data, base_data_dir, now=None, parse_deadline=None):
+    """
+    Writes views/summary.json and one shard per course. Shards whose hash is
+    unchanged are not rewritten; shards of courses that disappeared are removed.
+    Returns the summary.
+    """
+    views_dir = os.path.join(base_data_dir, VIEWS_DIRNAME)
+    os.makedirs(views_dir, exist_ok=True)
+    summary_path = os.path.join(views_dir, SUMMARY_FILENAME)
+
+    previous = {}
+    try:
+        with open(summary_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f).get("shards", {})
+    except (OSError, ValueError):
+        pass
+
+    summary, shards = build_views(all_courses_data, now=now, parse_deadline=parse_deadline)
+    written = 0
+    for shard_name, course in shards.items():
+        shard_path = os.path.join(views_dir, shard_name)
+        if previous.get(shard_name, {}).get("sha1") == summary["shards"][shard_name]["sha1"] and os.path.exists(shard_path):
+            continue
+        with open(shard_path, 'wb') as f:
+            f.write(_compact(course))
+        written += 1
+
+    for name in os.listdir(views_dir):
+        if name.startswith(SHARD_PREFIX) and name.endswith(".json") and name not in shards:
+            os.remove(os.path.join(views_dir, name))
+
+    with open(summary_path, 'wb') as f:
+        f.write(_compact(summary))
+    print(f"Wrote consumer views to {views_dir}: {len(summary['active_tugas'])} active tugas, "
+          f"{len(summary['upcoming_pertemuan'])} upcoming pertemuan, {written}/{len(shards)} shard(s) updated")
+    return summary
@@ -0,0 +1,204 @@
+import os
+import re
+import gzip
+import json
+import time
+import zlib
+import traceback
+from collections import deque
+from datetime import datetime
+
+# Failure forensics: an always-on ring buffer of the last FORENSICS_NAVIGATIONS
+# page loads of a browser session (URL, timings, the console errors, page
+# errors and failed requests seen on that page, and the zlib-compressed DOM
+# of the pages the scraper read). Nothing
+# is written while a run is healthy. When a unit of work (course, pertemuan,
+# tugas, queue task) fails or the run crashes, the buffer plus the DOM of the
+# page as it is right now is dumped as one gzipped JSON file:
+#
+#   forensics/<time>-<pid>-<seq>-<unit>.json.gz   (and .trace.zip for a traced retry)
+#
+# Playwright tracing is far too heavy to leave on, so it is only started for
+# the retry of a unit that has already failed once, and its zip is kept
+# (next to the dump) only when that retry fails as well.
+
+FORENSICS_DIR = os.getenv("FORENSICS_DIR", "forensics")
+FORENSICS_NAVIGATIONS = int(os.getenv("FORENSICS_NAVIGATIONS", "20"))
+FORENSICS_EVENTS_PER_PAGE = 50
+FORENSICS_TRACING = os.getenv("FORENSICS_TRACING", "1") != "0"
+
+
+def _slug(text):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", text or "")[:80].strip("_") or "unit"
+
+
+class _Navigation:
+    __slots__ = ("url", "started_at", "started", "dom_loaded_ms", "load_ms", "dom", "dom_bytes", "events")
+
+    def __init__(self, url):
+        self.url = url
+        self.started_at = datetime.now().isoformat(timespec="milliseconds")
+        self.started = time.monotonic()
+        self.dom_loaded_ms = None
+        self.load_ms = None
+        self.dom = None
+        self.dom_bytes = 0
+        self.events = deque(maxlen=FORENSICS_EVENTS_PER_PAGE)
+
+    def elapsed_ms(self):
+        return round((time.monotonic() - self.started) * 1000)
+
+    def to_dict(self):
+        return {
+            "url": self.url,
+            "started_at": self.started_at,
+            "dom_content_loaded_ms": self.dom_loaded_ms,
+            "load_ms": self.load_ms,
+            "dom_bytes": self.dom_bytes,
+            "events": list(self.events),
+            "dom": zlib.decompress(self.dom).decode("utf-8") if self.dom else None
+        }
+
+
+class FailureRecorder:
+    """
+    Keeps the recent navigation history of the pages it is attached to and
+    writes it out on demand. One recorder serves a whole BrowserSession, so
+    the history survives page and context recycling.
+    """
+
+    def __init__(self, size=FORENSICS_NAVIGATIONS, directory=FORENSICS_DIR):
+        self.navigations = deque(maxlen=size)
+        self.directory = directory
+        self.tracing = None
+        self.dumps = []
+        self.last_error = None
+        self.sequence = 0
+
+    def attach(self, page):
+        page.on("framenavigated", lambda frame: frame == page.main_frame and self._navigated(frame.url))
+        page.on("domcontentloaded", lambda _: self._timing("dom_loaded_ms"))
+        page.on("load", lambda _: self._timing("load_ms"))
+        page.on("console", lambda msg: msg.type in ("error", "warning")
+                and self._event("console." + msg.type, msg.text))
+        page.on("pageerror", lambda error: self._event("pageerror", str(error)))
+        page.on("requestfailed", lambda request: self._event(
+            "requestfailed", f"{request.method} {request.url}: {request.failure}"))
+        page.on("response", lambda response: response.status >= 400 and self._event(
+            "http." + str(response.status), f"{response.request.method} {response.url}"))
+
+    def _navigated(self, url):
+        self.navigations.append(_Navigation(url))
+
+    def _timing(self, field):
+        if self.navigations:
+            current = self.navigations[-1]
+            setattr(current, field, current.elapsed_ms())
+
+    def _event(self, kind, text):
+        if self.navigations:
+            current = self.navigations[-1]
+            current.events.append({"at_ms": current.elapsed_ms(), "kind": kind, "text": text[:2000]})
+
+    def note_dom(self, html):
+        """
+        Stores the DOM of the current navigation. The scraper passes the HTML
+        it fetches anyway for the HTML store, so the buffer adds no DOM
+        round-trips of its own; pages it never reads keep only URL, timings
+        and events (the dump still captures the page current at the failure).
+        """
+        if self.navigations and html:
+            data = html.encode("utf-8")
+            current = self.navigations[-1]
+            current.dom = zlib.compress(data, 1)
+            current.dom_bytes = len(data)
+
+    def _path(self, unit, suffix):
+        # pid and sequence number keep dumps from several workers, or within one second, apart
+        self.sequence += 1
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory,
+                            f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{self.sequence:03d}-{_slug(unit)}{suffix}")
+
+    def dump(self, unit, reason, page=None, error=None, trace_path=None):
+        """
+        Writes the buffer, the current page's URL and DOM, and the error with
+        its traceback to one gzipped JSON file. Never raises; returns the
+        path or None.
+        """
+        try:
+            current = {"url": None, "dom": None}
+            if page is not None:
+                try:
+                    current = {"url": page.url, "dom": page.content()}
+                except Exception as e:
+                    current["error"] = str(e)
+            artifact = {
+                "unit": unit,
+                "reason": reason,
+                "written_at": datetime.now().isoformat(timespec="seconds"),
+                "error": repr(error) if error is not None else None,
+                "traceback": "".join(traceback.format_exception(type(error), error, error.__traceback__))
+                             if error is not None else None,
+                "trace": trace_path,
+                "current_page": current,
+                "navigations": [n.to_dict() for n in self.navigations]
+            }
+            path = self._path(unit, ".json.gz")
+            with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as f:
+                json.dump(artifact, f, ensure_ascii=False)
+            self.dumps.append(path)
+            self.last_error = error
+            print(f"  Forensics for {unit} written to {path} ({os.path.getsize(path) / 1024:.0f} KiB)")
+            return path
+        except Exception as e:
+            print(f"  Could not write forensics for {unit}: {e}")
+            return None
+
+    def start_trace(self, context, unit):
+        """
+        Starts Playwright tracing for the retry of a failed unit. Returns False
+        when tracing is disabled or already running for an enclosing unit.
+        """
+        if not FORENSICS_TRACING or self.tracing is not None:
+            return False
+        try:
+            context.tracing.start(screenshots=True, snapshots=True)
+        except Exception as e:
+            print(f"  Could not start tracing for {unit}: {e}")
+            return False
+        self.tracing = (context, unit)
+        print(f"  Tracing the retry of {unit}")
+        return True
+
+    def stop_trace(self, keep):
+        """Stops tracing; the trace is only written when keep is true. Returns its path or None."""
+        if self.tracing is None:
+            return None
+        context, unit = self.tracing
+        self.tracing = None
+        path = self._path(unit, ".trace.zip") if keep else None
+        try:
+            context.tracing.stop(path=path)
+        except Exception as e:
+            print(f"  Could not stop tracing for {unit}: {e}")
+            return None
+        return path
+
+    def retry(self, unit, page, run, error):
+        """
+        Handles a failed unit: dumps what led up to the failure, then runs it
+        once more with tracing. If the retry fails too, its trace is kept, a
+        second dump points at it, and the retry's exception is raised.
+        """
+        self.dump(unit, "failed", page, error)
+        started = self.start_trace(page.context, unit)
+        try:
+            result = run()
+        except Exception as retry_error:
+            trace_path = self.stop_trace(keep=True) if started else None
+            self.dump(unit, "retry failed", page, retry_error, trace_path)
+            raise
+        if started:
+            self.stop_trace(keep=False)
+        return result
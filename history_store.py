@@ -0,0 +1,183 @@
+import json
+import zlib
+import sqlite3
+import hashlib
+from datetime import datetime
+from tugas_index import course_id
+
+# History of every scrape's results, stored structurally: each tugas,
+# pertemuan and course is a content-addressed node, and a pertemuan refers to
+# its tugas (and a course to its pertemuan) by hash. A run whose courses did
+# not change adds only a tiny root node, so a semester of daily runs costs
+# little more than one snapshot.
+#
+#   objects         hash -> zlib-compressed canonical JSON of one node
+#   runs            one row per archived run, pointing at its root node
+#   course_versions a row only when a course's hash differs from its last version
+#   tugas_versions  a row only when a tugas's hash differs from its last version
+#
+# The version tables make "course X on date D" a single indexed lookup and
+# "when did this deadline change" a scan over the changes of one tugas.
+
+HISTORY_FILENAME = "history.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    hash TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    taken_at TEXT NOT NULL,
+    root TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS course_versions (
+    course_key TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    kode TEXT NOT NULL,
+    PRIMARY KEY (course_key, run_id)
+);
+CREATE TABLE IF NOT EXISTS tugas_versions (
+    tugas_key TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    title TEXT,
+    deadline_iso TEXT,
+    active INTEGER,
+    PRIMARY KEY (tugas_key, run_id)
+);
+CREATE INDEX IF NOT EXISTS runs_taken_at ON runs (taken_at);
+CREATE INDEX IF NOT EXISTS course_versions_kode ON course_versions (kode);
+"""
+
+
+def _canonical(node):
+    return json.dumps(node, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def _tugas_key(course_key, pertemuan_key, tugas):
+    """
+    One key per tugas card. Every card of an upload page shares the page's
+    tugas ID, so the card title tells them apart.
+    """
+    page = tugas.get("id") or f"{course_key}|{pertemuan_key}|{tugas.get('pengumpulan_title')}"
+    return f"{page}|{tugas.get('title')}"
+
+
+class HistoryStore:
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _put(self, kind, node, counter):
+        data = _canonical(node)
+        node_hash = hashlib.sha1(data).hexdigest()
+        cursor = self.conn.execute("INSERT OR IGNORE INTO objects (hash, kind, data) VALUES (?, ?, ?)",
+                                   (node_hash, kind, zlib.compress(data, 6)))
+        counter[0] += cursor.rowcount
+        return node_hash
+
+    def _get(self, node_hash):
+        row = self.conn.execute("SELECT data FROM objects WHERE hash = ?", (node_hash,)).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def _latest_version(self, table, key_column, key):
+        row = self.conn.execute(
+            f"SELECT hash FROM {table} WHERE {key_column} = ? ORDER BY run_id DESC LIMIT 1", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def archive(self, all_courses_data, taken_at=None):
+        """
+        Stores one run of aggregated course data (the courses_data.json list).
+        Returns (run_id, new_objects): how many nodes were not already stored.
+        """
+        taken_at = (taken_at or datetime.now()).isoformat(timespec="seconds")
+        counter = [0]
+        with self.conn:
+            cursor = self.conn.execute("INSERT INTO runs (taken_at, root) VALUES (?, '')", (taken_at,))
+            run_id = cursor.lastrowid
+            root = {}
+            for course in all_courses_data:
+                course_info = (course or {}).get("course_info") or {}
+                if not course_info:
+                    continue
+                course_key = course_id(course_info)
+                pertemuan_refs = {}
+                for pertemuan_key, pertemuan in (course.get("pertemuan") or {}).items():
+                    tugas_refs = []
+                    keys_seen = {}
+                    for tugas in pertemuan.get("tugas") or []:
+                        tugas_hash = self._put("tugas", tugas, counter)
+                        tugas_refs.append(tugas_hash)
+                        tugas_key = _tugas_key(course_key, pertemuan_key, tugas)
+                        # Cards with the same title on one page are numbered in page order
+                        keys_seen[tugas_key] = keys_seen.get(tugas_key, 0) + 1
+                        if keys_seen[tugas_key] > 1:
+                            tugas_key = f"{tugas_key}#{keys_seen[tugas_key]}"
+                        if self._latest_version("tugas_versions", "tugas_key", tugas_key) != tugas_hash:
+                            self.conn.execute(
+                                "INSERT OR REPLACE INTO tugas_versions VALUES (?, ?, ?, ?, ?, ?)",
+                                (tugas_key, run_id, tugas_hash, tugas.get("title"), tugas.get("deadline_iso"),
+                                 int(bool(tugas.get("active"))))
+                            )
+                    node = {key: value for key, value in pertemuan.items() if key != "tugas"}
+                    node["tugas"] = tugas_refs
+                    pertemuan_refs[pertemuan_key] = self._put("pertemuan", node, counter)
+                course_hash = self._put("course", {"course_info": course_info, "pertemuan": pertemuan_refs}, counter)
+                root[course_key] = course_hash
+                if self._latest_version("course_versions", "course_key", course_key) != course_hash:
+                    self.conn.execute("INSERT OR REPLACE INTO course_versions VALUES (?, ?, ?, ?)",
+                                      (course_key, run_id, course_hash, course_info.get("kode", "")))
+            root_hash = self._put("run", root, counter)
+            self.conn.execute("UPDATE runs SET root = ? WHERE id = ?", (root_hash, run_id))
+        return run_id, counter[0]
+
+    def _expand_course(self, course_hash):
+        node = self._get(course_hash)
+        pertemuan = {}
+        for key, pertemuan_hash in node["pertemuan"].items():
+            p = self._get(pertemuan_hash)
+            p["tugas"] = [self._get(h) for h in p["tugas"]]
+            # Keep the key order of the original pertemuan dict
+            pertemuan[key] = {k: p[k] for k in ("files", "tugas", "date_raw", "date_iso") if k in p}
+        return {"course_info": node["course_info"], "pertemuan": pertemuan}
+
+    def course_at(self, kode, when=None):
+        """
+        The course (matched by kode, or by its tugas_index.course_id) as of
+        the last run at or before `when`. Returns (taken_at, course) or None.
+        """
+        when = (when or datetime.now()).isoformat(timespec="seconds")
+        row = self.conn.execute(
+            "SELECT v.hash, r.taken_at FROM course_versions v JOIN runs r ON r.id = v.run_id "
+            "WHERE (v.kode = ? OR v.course_key = ?) AND r.taken_at <= ? ORDER BY v.run_id DESC LIMIT 1",
+            (kode, kode, when)
+        ).fetchone()
+        if row is None:
+            return None
+        # taken_at of the version is when it first appeared; it is still current at `when`.
+        return row[1], self._expand_course(row[0])
+
+    def tugas_history(self, text):
+        """
+        Every recorded version of the tugas whose key or title contains `text`:
+        [(tugas_key, taken_at, title, deadline_iso, active)] in run order.
+        """
+        pattern = f"%{text}%"
+        return self.conn.execute(
+            "SELECT v.tugas_key, r.taken_at, v.title, v.deadline_iso, v.active FROM tugas_versions v "
+            "JOIN runs r ON r.id = v.run_id WHERE v.tugas_key LIKE ? OR v.title LIKE ? "
+            "ORDER BY v.tugas_key, v.run_id", (pattern, pattern)
+        ).fetchall()
+
+    def stats(self):
+        runs, first, last = self.conn.execute("SELECT COUNT(*), MIN(taken_at), MAX(taken_at) FROM runs").fetchone()
+        objects, stored_bytes = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM objects").fetchone()
+        return {"runs": runs, "first_run": first, "last_run": last, "objects": objects, "stored_bytes": stored_bytes}
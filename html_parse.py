@@ -0,0 +1,242 @@
+import re
+from datetime import datetime
+from html.parser import HTMLParser
+from records import Pertemuan, FileLink, Tugas
+
+# Extraction of course data from captured page HTML, without a browser.
+# Each parser mirrors the locators the scraper used on the live page, on a
+# small DOM built with the stdlib html.parser, so it runs in any process
+# (see the parse pool and `python Scraper.py reparse`).
+
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'param', 'source', 'track', 'wbr'
+}
+
+
+class Node:
+    __slots__ = ("tag", "attrs", "children", "parent")
+
+    def __init__(self, tag, attrs, parent=None):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = []
+        self.parent = parent
+
+    def elements(self):
+        return [c for c in self.children if isinstance(c, Node)]
+
+    def iter(self, tag=None):
+        """Descendant elements in document order, like a CSS descendant selector."""
+        stack = list(reversed(self.elements()))
+        while stack:
+            node = stack.pop()
+            if tag is None or node.tag == tag:
+                yield node
+            stack.extend(reversed(node.elements()))
+
+    def has_class(self, name):
+        return name in (self.attrs.get("class") or "").split()
+
+    def find_id(self, element_id):
+        return next((n for n in self.iter() if n.attrs.get("id") == element_id), None)
+
+    def text(self):
+        """Concatenated text of the subtree, like DOM textContent."""
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                parts.append(node)
+            else:
+                stack.extend(reversed(node.children))
+        return "".join(parts)
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#document", {})
+        self.stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, {k: (v if v is not None else "") for k, v in attrs}, self.stack[-1])
+        self.stack[-1].children.append(node)
+        if tag not in VOID_ELEMENTS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        node = Node(tag, {k: (v if v is not None else "") for k, v in attrs}, self.stack[-1])
+        self.stack[-1].children.append(node)
+
+    def handle_endtag(self, tag):
+        # Close up to the matching open element; stray end tags are ignored.
+        for depth in range(len(self.stack) - 1, 0, -1):
+            if self.stack[depth].tag == tag:
+                del self.stack[depth:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1].children.append(data)
+
+
+def parse_document(html):
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+def _body_rows(table):
+    """`<table> tbody tr`: every row inside a tbody of the table."""
+    if table is None:
+        return []
+    return [tr for tbody in table.iter("tbody") for tr in tbody.iter("tr")]
+
+
+# --- Dates ---
+
+def parse_indonesian_date(date_str):
+    month_map = {
+        'Januari': 'January', 'Februari': 'February', 'Maret': 'March',
+        'April': 'April', 'Mei': 'May', 'Juni': 'June',
+        'Juli': 'July', 'Agustus': 'August', 'September': 'September',
+        'Oktober': 'October', 'November': 'November', 'Desember': 'December'
+    }
+
+    try:
+        date_match = re.search(r'(\d{1,2})\s+([A-Za-z]+)\s+(\d{4})', date_str)
+        if date_match:
+            day = date_match.group(1)
+            id_month = date_match.group(2)
+            year = date_match.group(3)
+
+            if id_month in month_map:
+                en_month = month_map[id_month]
+                date_obj = datetime.strptime(f"{day} {en_month} {year}", "%d %B %Y")
+                return date_obj
+    except Exception as e:
+        print(f"Date parsing error: {e}")
+    return None
+
+
+def parse_deadline(deadline_str):
+    """
+    Parses a tugas deadline such as '25 April 2025 | 23:59' including its time.
+    Falls back to the end of the day when no time is given.
+    """
+    date_obj = parse_indonesian_date(deadline_str or "")
+    if not date_obj:
+        return None
+    time_match = re.search(r'\|\s*(\d{1,2}):(\d{2})', deadline_str)
+    if time_match:
+        return date_obj.replace(hour=int(time_match.group(1)), minute=int(time_match.group(2)))
+    return date_obj.replace(hour=23, minute=59)
+
+
+# --- Page parsers ---
+
+def parse_course_list(html):
+    """
+    Course info dicts from the courses list page ({} for a row that could not
+    be read). Raises ValueError if the page has no courses grid at all (e.g.
+    the SSO login page after the session expired).
+    """
+    document = parse_document(html)
+    grid = document.find_id("MainContent_gridData")
+    if grid is None:
+        raise ValueError("Not a courses list page (no #MainContent_gridData)")
+    course_info_list = []
+    for row in _body_rows(grid):
+        cells = list(row.iter("td"))
+        if len(cells) < 7:
+            course_info_list.append({})
+            continue
+        course_info_list.append({
+            "kode": cells[5].text().strip(),
+            "nama": cells[6].text().strip(),
+            "dosen": cells[1].text().replace('\n', ', ').strip(),
+            "kelas": cells[2].text().strip(),
+            "tahun_ajaran": cells[3].text().strip()
+        })
+    return course_info_list
+
+
+def _pertemuan_info(cell, default_key):
+    """Key, raw date line and ISO date from the first cell of a pertemuan row."""
+    key, date_raw, date_iso = default_key, None, None
+    lines = [line.strip() for line in cell.text().split('\n') if line.strip()] if cell is not None else []
+    if lines:
+        key = lines[0].split('(')[0].strip()
+        # Search all lines for a date pattern (e.g., 'Jumat, 25 April 2025')
+        for line in lines:
+            date_match = re.search(r'\d{1,2} [A-Za-z]+ \d{4}', line)
+            if date_match:
+                date_raw = line
+                date_obj = parse_indonesian_date(date_match.group(0))
+                if date_obj:
+                    date_iso = date_obj.isoformat()
+                break
+    return key, date_raw, date_iso
+
+
+def parse_course_detail(html, base_url="", sanitize_key=None):
+    """
+    Pertemuan rows of a course detail page, as (pertemuan, pengumpulan) where
+    pengumpulan lists (link_index, title, href) of the row's 'Pengumpulan
+    Tugas' links. link_index counts the links in the row's second cell, which
+    is what the scraper clicks by. Relative file URLs are joined to base_url.
+    Raises ValueError if the page has no pertemuan grid, so a login page is
+    never mistaken for a course without pertemuan.
+    """
+    document = parse_document(html)
+    grid = document.find_id("MainContent_gridDetail")
+    if grid is None:
+        raise ValueError("Not a course detail page (no #MainContent_gridDetail)")
+    rows = []
+    for j, row in enumerate(_body_rows(grid)):
+        cells = [c for c in row.elements() if c.tag == "td"]
+        key, date_raw, date_iso = _pertemuan_info(cells[0] if cells else None, f"Pertemuan_{j+1}")
+        if sanitize_key:
+            key = sanitize_key(key)
+        pertemuan = Pertemuan(key=key, date_raw=date_raw, date_iso=date_iso)
+        pengumpulan = []
+        links = list(cells[1].iter("a")) if len(cells) > 1 else []
+        for k, link in enumerate(links):
+            title = link.text().strip()
+            text = title.upper()
+            # [TUGAS] and [BAHAN AJAR] links are file metadata
+            if "[TUGAS]" in text or "[BAHAN AJAR]" in text:
+                href = link.attrs.get("href")
+                pertemuan.add_file(FileLink(
+                    filename_suggested=link.attrs.get("download") or "unknown_filename",
+                    title=title,
+                    url=f"{base_url}{href}" if href and not href.startswith("http") else href
+                ))
+            elif "PENGUMPULAN TUGAS" in text:
+                pengumpulan.append((k, title, link.attrs.get("href")))
+        rows.append((pertemuan, pengumpulan))
+    return rows
+
+
+def parse_tugas_page(html, now=None):
+    """Tugas cards of a 'Pengumpulan Tugas' upload page. pengumpulan_title is left for the caller."""
+    now = now or datetime.now()
+    document = parse_document(html)
+    tugas_list = []
+    for card in document.iter():
+        if not card.has_class("card"):
+            continue
+        header = next((n for n in card.iter() if n.has_class("card-header")), None)
+        deadline_span = next((n for n in card.iter("span") if "color: red" in n.attrs.get("style", "")), None)
+        deadline_text = deadline_span.text().strip() if deadline_span is not None else ""
+        deadline_date = parse_deadline(deadline_text) if deadline_text else None
+        tugas_list.append(Tugas(
+            pengumpulan_title="",
+            title=header.text().strip() if header is not None else "",
+            deadline=deadline_text,
+            deadline_iso=deadline_date.isoformat() if deadline_date else None,
+            active=bool(deadline_date and deadline_date > now)
+        ))
+    return tugas_list
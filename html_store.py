@@ -0,0 +1,113 @@
+import os
+import re
+import gzip
+import json
+import hashlib
+from datetime import datetime
+from urllib.parse import quote, unquote
+
+# On-disk store of the raw HTML of every visited page (courses list, course
+# detail, tugas upload pages), so parsing can run apart from the browser and
+# `python Scraper.py reparse` can rebuild all output without the network.
+#
+#   objects/<ab>/<sha1>.html.gz   gzipped page HTML, stored once per content hash
+#   refs/<page identity>.json     {"sha1", "captured_at", "meta"} of the latest capture
+#
+# One small ref file per page (instead of a shared manifest) lets several
+# queue workers capture into the same store without clobbering each other.
+
+HTML_STORE_DIRNAME = "raw_html"
+
+# ASP.NET postback state changes on every load and is never parsed; dropping
+# it keeps captures small and lets unchanged pages dedupe by hash.
+_ASPNET_STATE_RE = re.compile(
+    r'(<input[^>]*\bname="__(?:VIEWSTATE|VIEWSTATEGENERATOR|EVENTVALIDATION)"[^>]*\bvalue=")[^"]*(")',
+    re.IGNORECASE
+)
+
+
+def course_list_identity():
+    return "course_list"
+
+
+def course_detail_identity(course):
+    return f"course_detail|{course}"
+
+
+def tugas_page_identity(tugas):
+    return f"tugas_page|{tugas}"
+
+
+class HtmlStore:
+    def __init__(self, path):
+        self.path = path
+        self.objects_dir = os.path.join(path, "objects")
+        self.refs_dir = os.path.join(path, "refs")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.refs_dir, exist_ok=True)
+
+    def _object_path(self, sha1):
+        return os.path.join(self.objects_dir, sha1[:2], f"{sha1}.html.gz")
+
+    def _ref_path(self, identity):
+        return os.path.join(self.refs_dir, quote(identity, safe="") + ".json")
+
+    def capture(self, identity, html, meta=None):
+        """Stores a page's HTML under its identity. Returns the content sha1."""
+        html = _ASPNET_STATE_RE.sub(r"\1\2", html)
+        data = html.encode("utf-8")
+        sha1 = hashlib.sha1(data).hexdigest()
+        object_path = self._object_path(sha1)
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            tmp_path = f"{object_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(gzip.compress(data, compresslevel=6))
+            os.replace(tmp_path, object_path)
+
+        ref_path = self._ref_path(identity)
+        tmp_path = f"{ref_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"sha1": sha1, "captured_at": datetime.now().isoformat(), "meta": meta or {}},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, ref_path)
+        return sha1
+
+    def ref(self, identity):
+        try:
+            with open(self._ref_path(identity), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load(self, identity):
+        """The latest captured HTML for a page, or None."""
+        ref = self.ref(identity)
+        if ref is None:
+            return None
+        try:
+            with open(self._object_path(ref["sha1"]), "rb") as f:
+                return gzip.decompress(f.read()).decode("utf-8")
+        except OSError:
+            return None
+
+    def identities(self, prefix=""):
+        return sorted(
+            identity for identity in (unquote(name[:-5]) for name in os.listdir(self.refs_dir) if name.endswith(".json"))
+            if identity.startswith(prefix)
+        )
+
+    def prune(self):
+        """Deletes objects no ref points to any more. Returns (removed, kept_bytes)."""
+        referenced = {ref["sha1"] for ref in (self.ref(i) for i in self.identities()) if ref}
+        removed = kept_bytes = 0
+        for bucket in os.listdir(self.objects_dir):
+            bucket_dir = os.path.join(self.objects_dir, bucket)
+            for name in os.listdir(bucket_dir):
+                path = os.path.join(bucket_dir, name)
+                if name.split(".", 1)[0] in referenced:
+                    kept_bytes += os.path.getsize(path)
+                else:
+                    os.remove(path)
+                    removed += 1
+        return removed, kept_bytes
@@ -0,0 +1,325 @@
+import os
+import sys
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Typed records for everything the scraper extracts, plus a JSON codec that
+# uses orjson or msgspec when installed and falls back to the stdlib.
+#
+# to_dict() produces the dicts the scraper always wrote (including the
+# one-element date_raw/date_iso lists the extension reads), with one
+# addition: every tugas carries an "id" key, its stable ID from
+# tugas_index.tugas_id() (null for data from before IDs existed). from_dict()
+# accepts both shapes.
+
+
+class RecordValidationError(ValueError):
+    pass
+
+
+def _check_str(record, name, value, optional=False):
+    if value is None and optional:
+        return
+    if not isinstance(value, str):
+        raise RecordValidationError(f"{type(record).__name__}.{name} must be a string, got {type(value).__name__}")
+
+
+def _first(value):
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+@dataclass(slots=True)
+class CourseInfo:
+    kode: str = ""
+    nama: str = ""
+    dosen: str = ""
+    kelas: str = ""
+    tahun_ajaran: str = ""
+
+    def __post_init__(self):
+        for name in ("kode", "nama", "dosen", "kelas", "tahun_ajaran"):
+            _check_str(self, name, getattr(self, name))
+
+    def to_dict(self):
+        return {
+            "kode": self.kode,
+            "nama": self.nama,
+            "dosen": self.dosen,
+            "kelas": self.kelas,
+            "tahun_ajaran": self.tahun_ajaran
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(
+            kode=data.get("kode", ""),
+            nama=data.get("nama", ""),
+            dosen=data.get("dosen", ""),
+            kelas=data.get("kelas", ""),
+            tahun_ajaran=data.get("tahun_ajaran", "")
+        )
+
+    def is_empty(self):
+        return not (self.kode or self.nama)
+
+
+@dataclass(slots=True)
+class FileLink:
+    filename_suggested: str
+    title: str
+    url: Optional[str]
+
+    def __post_init__(self):
+        _check_str(self, "filename_suggested", self.filename_suggested)
+        _check_str(self, "title", self.title)
+        _check_str(self, "url", self.url, optional=True)
+
+    def key(self):
+        return (self.filename_suggested, self.title, self.url)
+
+    def to_dict(self):
+        return {
+            "filename_suggested": self.filename_suggested,
+            "title": self.title,
+            "url": self.url
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            filename_suggested=data.get("filename_suggested", "unknown_filename"),
+            title=data.get("title", ""),
+            url=data.get("url")
+        )
+
+
+@dataclass(slots=True)
+class Tugas:
+    pengumpulan_title: str
+    title: str
+    deadline: str = ""
+    deadline_iso: Optional[str] = None
+    active: bool = False
+    id: Optional[str] = None  # stable ID from tugas_index.tugas_id()
+
+    def __post_init__(self):
+        _check_str(self, "pengumpulan_title", self.pengumpulan_title)
+        _check_str(self, "title", self.title)
+        _check_str(self, "deadline", self.deadline)
+        _check_str(self, "deadline_iso", self.deadline_iso, optional=True)
+        if not isinstance(self.active, bool):
+            raise RecordValidationError(f"Tugas.active must be a bool, got {type(self.active).__name__}")
+        _check_str(self, "id", self.id, optional=True)
+
+    def to_dict(self):
+        return {
+            "pengumpulan_title": self.pengumpulan_title,
+            "title": self.title,
+            "deadline": self.deadline,
+            "deadline_iso": self.deadline_iso,
+            "active": self.active,
+            "id": self.id
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            pengumpulan_title=data.get("pengumpulan_title", ""),
+            title=data.get("title", ""),
+            deadline=data.get("deadline", "") or "",
+            deadline_iso=data.get("deadline_iso"),
+            active=bool(data.get("active", False)),
+            id=data.get("id")
+        )
+
+
+@dataclass(slots=True)
+class Pertemuan:
+    key: str
+    date_raw: Optional[str] = None
+    date_iso: Optional[str] = None
+    files: List[FileLink] = field(default_factory=list)
+    tugas: List[Tugas] = field(default_factory=list)
+
+    def __post_init__(self):
+        _check_str(self, "key", self.key)
+        _check_str(self, "date_raw", self.date_raw, optional=True)
+        _check_str(self, "date_iso", self.date_iso, optional=True)
+
+    def add_file(self, file_link):
+        """Appends a file unless an identical one is already listed."""
+        if any(f.key() == file_link.key() for f in self.files):
+            return False
+        self.files.append(file_link)
+        return True
+
+    def to_dict(self):
+        return {
+            "files": [f.to_dict() for f in self.files],
+            "tugas": [t.to_dict() for t in self.tugas],
+            "date_raw": [self.date_raw] if self.date_raw is not None else [],
+            "date_iso": [self.date_iso] if self.date_iso is not None else []
+        }
+
+    @classmethod
+    def from_dict(cls, key, data):
+        return cls(
+            key=key,
+            date_raw=_first(data.get("date_raw")),
+            date_iso=_first(data.get("date_iso")),
+            files=[FileLink.from_dict(f) for f in data.get("files", [])],
+            tugas=[Tugas.from_dict(t) for t in data.get("tugas", [])]
+        )
+
+
+@dataclass(slots=True)
+class Course:
+    info: CourseInfo
+    pertemuan: Dict[str, Pertemuan] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if not isinstance(self.info, CourseInfo):
+            raise RecordValidationError("Course.info must be a CourseInfo")
+
+    def add_pertemuan(self, pertemuan):
+        self.pertemuan[pertemuan.key] = pertemuan
+
+    def to_dict(self):
+        return {
+            "course_info": self.info.to_dict() if not self.info.is_empty() else {},
+            "pertemuan": {key: p.to_dict() for key, p in self.pertemuan.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            info=CourseInfo.from_dict(data.get("course_info")),
+            pertemuan={key: Pertemuan.from_dict(key, p) for key, p in (data.get("pertemuan") or {}).items()}
+        )
+
+
+# --- JSON codec ---
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if orjson is not None:
+    JSON_BACKEND = "orjson"
+elif msgspec is not None:
+    JSON_BACKEND = "msgspec"
+else:
+    JSON_BACKEND = "json"
+
+
+def dumps(data, pretty=False, backend=None):
+    """Encodes plain data (dicts/lists, e.g. from to_dict()) to UTF-8 JSON bytes."""
+    backend = backend or JSON_BACKEND
+    if backend == "orjson":
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if backend == "msgspec":
+        encoded = msgspec.json.encode(data)
+        return msgspec.json.format(encoded, indent=2) if pretty else encoded
+    if pretty:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data, backend=None):
+    backend = backend or JSON_BACKEND
+    if backend == "orjson":
+        return orjson.loads(data)
+    if backend == "msgspec":
+        return msgspec.json.decode(data)
+    return json.loads(data)
+
+
+def write_json(path, data, pretty=True):
+    """Writes JSON atomically (temp file + rename) so readers never see a half-written file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(dumps(data, pretty=pretty))
+    os.replace(tmp_path, path)
+
+
+def read_json(path):
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+# --- Benchmark: python records.py [N] ---
+
+def _sample_course_dict(i, pertemuan_count=16):
+    return {
+        "course_info": {"kode": f"IF{i:04d}", "nama": f"Mata Kuliah {i}", "dosen": "Dosen A, Dosen B",
+                        "kelas": "TI-2A", "tahun_ajaran": "2025/2026 Ganjil"},
+        "pertemuan": {
+            f"Pertemuan {j + 1}": {
+                "files": [{"filename_suggested": f"materi_{j}.pdf", "title": f"[BAHAN AJAR] Materi {j}",
+                           "url": f"https://sia.polytechnic.astra.ac.id/Files/{i}/{j}.pdf"}],
+                "tugas": [{"pengumpulan_title": f"Pengumpulan Tugas {j}", "title": f"Tugas {j}",
+                           "deadline": "25 April 2025 | 23:59", "deadline_iso": "2025-04-25T23:59:00",
+                           "active": False}],
+                "date_raw": ["Jumat, 25 April 2025"],
+                "date_iso": ["2025-04-25T00:00:00"]
+            } for j in range(pertemuan_count)
+        }
+    }
+
+
+def _measure(build):
+    tracemalloc.start()
+    started = time.perf_counter()
+    data = build()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return data, current, elapsed
+
+
+def run_benchmark(course_count=250):
+    """Compares memory of dicts vs slotted records and the speed of each available JSON backend."""
+    template = [_sample_course_dict(i) for i in range(course_count)]
+    encoded = json.dumps(template).encode('utf-8')
+    record_count = course_count * (1 + 16 * 3)
+    print(f"{course_count} courses, {record_count} records, {len(encoded) / 1024:.0f} KiB of JSON")
+
+    dicts, dict_bytes, _ = _measure(lambda: json.loads(encoded))
+    # Decode inside the measurement so records own fresh strings, like dicts do.
+    courses, record_bytes, build_seconds = _measure(lambda: [Course.from_dict(c) for c in json.loads(encoded)])
+    print(f"  memory: dicts {dict_bytes / 1024:.0f} KiB, records {record_bytes / 1024:.0f} KiB"
+          f" ({record_bytes / dict_bytes:.0%}); decoding into records took {build_seconds * 1000:.1f} ms")
+
+    started = time.perf_counter()
+    plain = [c.to_dict() for c in courses]
+    print(f"  to_dict: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    backends = ["json"] + [name for name, module in (("orjson", orjson), ("msgspec", msgspec)) if module]
+    for backend in backends:
+        started = time.perf_counter()
+        out = dumps(plain, pretty=True, backend=backend)
+        encode_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        loads(out, backend=backend)
+        decode_ms = (time.perf_counter() - started) * 1000
+        print(f"  {backend:8s} encode {encode_ms:7.1f} ms, decode {decode_ms:7.1f} ms")
+    started = time.perf_counter()
+    json.dumps(plain, ensure_ascii=False, indent=4)
+    print(f"  json.dumps(indent=4) as before: {(time.perf_counter() - started) * 1000:.1f} ms")
+    del dicts
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 250)
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+# Deadline-aware scheduling for the long-running mode (`python Scraper.py daemon`).
+# Pure bookkeeping: which course is due, and whether the hourly request budget
+# allows scraping it now. The browser side lives in Scraper.py.
+
+SCHEDULE_FILE = "scheduler_state.json"
+
+# A course with a tugas due within HOT_WINDOW_HOURS is "hot" and refreshed at
+# most every HOT_INTERVAL_MINUTES, tightening towards MIN_INTERVAL_MINUTES as
+# the deadline gets closer. Within WARM_WINDOW_DAYS it is "warm"; anything
+# else (no active tugas) is "cold" and refreshed about once a day.
+HOT_WINDOW_HOURS = float(os.getenv("SCHEDULER_HOT_WINDOW_HOURS", "48"))
+WARM_WINDOW_DAYS = float(os.getenv("SCHEDULER_WARM_WINDOW_DAYS", "7"))
+MIN_INTERVAL_MINUTES = float(os.getenv("SCHEDULER_MIN_INTERVAL_MINUTES", "10"))
+HOT_INTERVAL_MINUTES = float(os.getenv("SCHEDULER_HOT_INTERVAL_MINUTES", "30"))
+WARM_INTERVAL_MINUTES = float(os.getenv("SCHEDULER_WARM_INTERVAL_MINUTES", "180"))
+COLD_INTERVAL_MINUTES = float(os.getenv("SCHEDULER_COLD_INTERVAL_MINUTES", str(24 * 60)))
+
+# Upper bound on page navigations (our "requests") per rolling hour.
+REQUESTS_PER_HOUR = int(os.getenv("SCHEDULER_REQUESTS_PER_HOUR", "120"))
+
+# Navigations assumed for a course that has never been scraped.
+DEFAULT_COURSE_COST = 4
+
+# A course whose scrape failed is retried after FAILURE_BACKOFF_MINUTES,
+# doubling with each consecutive failure up to the cold interval.
+FAILURE_BACKOFF_MINUTES = float(os.getenv("SCHEDULER_FAILURE_BACKOFF_MINUTES", "5"))
+
+
+def refresh_interval(next_deadline, now):
+    """Returns how long to wait before re-scraping a course whose nearest open deadline is `next_deadline`."""
+    if next_deadline is None or next_deadline <= now:
+        return timedelta(minutes=COLD_INTERVAL_MINUTES)
+    remaining = next_deadline - now
+    if remaining <= timedelta(hours=HOT_WINDOW_HOURS):
+        # Check roughly six times over whatever time is left, within the hot bounds.
+        minutes = remaining.total_seconds() / 60 / 6
+        return timedelta(minutes=min(HOT_INTERVAL_MINUTES, max(MIN_INTERVAL_MINUTES, minutes)))
+    if remaining <= timedelta(days=WARM_WINDOW_DAYS):
+        return timedelta(minutes=WARM_INTERVAL_MINUTES)
+    return timedelta(minutes=COLD_INTERVAL_MINUTES)
+
+
+class RequestBudget:
+    """Sliding one-hour window of spent requests."""
+
+    def __init__(self, per_hour=REQUESTS_PER_HOUR):
+        self.per_hour = per_hour
+        self.spent = deque()  # (timestamp, cost)
+
+    def _expire(self, now):
+        while self.spent and self.spent[0][0] <= now - 3600:
+            self.spent.popleft()
+
+    def used(self, now=None):
+        now = time.time() if now is None else now
+        self._expire(now)
+        return sum(cost for _, cost in self.spent)
+
+    def can_spend(self, cost, now=None):
+        # A single unit larger than the whole budget is still allowed on an empty window.
+        used = self.used(now)
+        return used == 0 or used + cost <= self.per_hour
+
+    def spend(self, cost, now=None):
+        self.spent.append((time.time() if now is None else now, cost))
+
+    def seconds_until_available(self, cost, now=None):
+        now = time.time() if now is None else now
+        if self.can_spend(cost, now):
+            return 0
+        used = self.used(now)
+        for timestamp, spent_cost in self.spent:
+            used -= spent_cost
+            if used == 0 or used + cost <= self.per_hour:
+                return max(0, timestamp + 3600 - now)
+        return 3600
+
+
+class CourseSchedule:
+    """
+    Per-course schedule persisted to SCHEDULE_FILE:
+    {course_key: {"last_scraped", "next_due", "next_deadline", "cost"[, "failures"]}} with ISO timestamps.
+    """
+
+    def __init__(self, path=SCHEDULE_FILE):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                print(f"Error loading schedule, starting fresh: {e}")
+
+    def save(self):
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=4)
+        except Exception as e:
+            print(f"Error saving schedule: {e}")
+
+    def ensure(self, course_key, now):
+        """Registers a course; unknown courses are due immediately."""
+        if course_key not in self.entries:
+            self.entries[course_key] = {
+                "last_scraped": None,
+                "next_due": now.isoformat(),
+                "next_deadline": None,
+                "cost": DEFAULT_COURSE_COST
+            }
+
+    def seed(self, course_key, next_deadline, last_scraped):
+        """Initialises a course from existing output so a restart does not rescrape everything."""
+        if course_key in self.entries or last_scraped is None:
+            return
+        self.entries[course_key] = {
+            "last_scraped": last_scraped.isoformat(),
+            "next_due": (last_scraped + refresh_interval(next_deadline, last_scraped)).isoformat(),
+            "next_deadline": next_deadline.isoformat() if next_deadline else None,
+            "cost": DEFAULT_COURSE_COST
+        }
+
+    def record(self, course_key, scraped_at, next_deadline, cost):
+        self.entries[course_key] = {
+            "last_scraped": scraped_at.isoformat(),
+            "next_due": (scraped_at + refresh_interval(next_deadline, scraped_at)).isoformat(),
+            "next_deadline": next_deadline.isoformat() if next_deadline else None,
+            "cost": max(1, cost)
+        }
+
+    def record_failure(self, course_key, failed_at):
+        """Postpones a course after a failed scrape; the next successful record() clears the count."""
+        entry = self.entries.setdefault(course_key, {
+            "last_scraped": None, "next_deadline": None, "cost": DEFAULT_COURSE_COST
+        })
+        entry["failures"] = entry.get("failures", 0) + 1
+        backoff = min(FAILURE_BACKOFF_MINUTES * 2 ** (entry["failures"] - 1), COLD_INTERVAL_MINUTES)
+        entry["next_due"] = (failed_at + timedelta(minutes=backoff)).isoformat()
+        return timedelta(minutes=backoff)
+
+    def cost(self, course_key):
+        return self.entries.get(course_key, {}).get("cost", DEFAULT_COURSE_COST)
+
+    def due(self, now, course_keys=None):
+        """Due courses, most urgent first: nearest open deadline, then longest overdue."""
+        due = []
+        for key, entry in self.entries.items():
+            if course_keys is not None and key not in course_keys:
+                continue
+            next_due = datetime.fromisoformat(entry["next_due"])
+            if next_due > now:
+                continue
+            deadline = entry.get("next_deadline")
+            deadline = datetime.fromisoformat(deadline) if deadline else None
+            has_deadline = deadline is not None and deadline > now
+            due.append(((0 if has_deadline else 1, deadline or next_due, next_due), key))
+        return [key for _, key in sorted(due)]
+
+    def next_wakeup(self, now, course_keys=None):
+        """Earliest next_due among the (optionally filtered) courses."""
+        times = [datetime.fromisoformat(e["next_due"]) for k, e in self.entries.items()
+                 if course_keys is None or k in course_keys]
+        return min(times) if times else now + timedelta(minutes=COLD_INTERVAL_MINUTES)
@@ -0,0 +1,197 @@
+import os
+import re
+import json
+from datetime import datetime, timedelta
+
+# Stable identifiers for courses, pertemuan and tugas, and the persisted
+# tugas index (scraper_state.json) that decides which tugas pages are worth
+# opening again.
+#
+# IDs come from what the server itself uses to tell things apart: the
+# course's kode/kelas/tahun ajaran, and for tugas the 'Pengumpulan Tugas'
+# postback link (its argument) or its query string. A LinkButton with an
+# empty argument only names its grid slot, so that control name is combined
+# with the pertemuan and title. Only when the link
+# carries nothing usable does the ID fall back to the pertemuan and title.
+#
+# The index replaces the old {legacy_key: is_active} map. Entries expire when
+# their semester is no longer on the courses list or after STATE_TTL_DAYS
+# unseen, and inactive tugas are re-verified every REVERIFY_INACTIVE_DAYS
+# (every run while the deadline is only REVERIFY_RECENT_DAYS old), so a
+# deadline extension is eventually noticed.
+
+INDEX_VERSION = 2
+STATE_TTL_DAYS = float(os.getenv("STATE_TTL_DAYS", "180"))
+REVERIFY_INACTIVE_DAYS = float(os.getenv("REVERIFY_INACTIVE_DAYS", "7"))
+REVERIFY_RECENT_DAYS = float(os.getenv("REVERIFY_RECENT_DAYS", "3"))
+
+# Joins the levels of an ID; '/' cannot be used because tahun ajaran contains it.
+ID_SEPARATOR = "|"
+
+_POSTBACK_RE = re.compile(r"__doPostBack\(\s*'([^']*)'\s*,\s*'([^']*)'\s*\)")
+# `kode` is left out on purpose: it is the course code, shared by every tugas of the course.
+_QUERY_ID_RE = re.compile(r"[?&](?:id|idtugas|id_tugas)=([^&#]+)", re.IGNORECASE)
+
+
+def _normalize(text):
+    return " ".join((text or "").split()).lower()
+
+
+def course_id(course_info, course_index=None):
+    """kode/kelas/tahun ajaran identify a class offering; the row index is only a last resort."""
+    course_info = course_info or {}
+    parts = [_normalize(course_info.get(k)) for k in ("kode", "kelas", "tahun_ajaran")]
+    if not parts[0]:
+        return f"course:index-{course_index}"
+    return "course:" + ":".join(parts)
+
+
+def pertemuan_id(course, pertemuan_key):
+    return f"{course}{ID_SEPARATOR}{_normalize(pertemuan_key)}"
+
+
+def course_of(identifier):
+    """The course ID a pertemuan or tugas ID belongs to."""
+    return identifier.split(ID_SEPARATOR, 1)[0]
+
+
+def server_tugas_ref(href):
+    """
+    The server's own identifier in a 'Pengumpulan Tugas' link: the postback
+    argument, or the postback control name when the argument is empty (as
+    for ASP.NET LinkButtons such as `ctl00$MainContent$gridDetail$ctl02$lnkX`),
+    an id-like query parameter, or None.
+    """
+    if not href:
+        return None
+    match = _POSTBACK_RE.search(href)
+    if match:
+        return match.group(2) or match.group(1) or None
+    match = _QUERY_ID_RE.search(href)
+    if match:
+        return match.group(1)
+    return None
+
+
+def tugas_id(pertemuan, href, pengumpulan_title):
+    match = _POSTBACK_RE.search(href or "")
+    if match and match.group(1) and not match.group(2):
+        # A LinkButton control name only says which slot of the grid the link is
+        # in; the title keeps a different tugas in the same slot from inheriting it.
+        return f"{pertemuan}{ID_SEPARATOR}{match.group(1)}{ID_SEPARATOR}{_normalize(pengumpulan_title)}"
+    ref = server_tugas_ref(href)
+    if ref:
+        return f"{course_of(pertemuan)}{ID_SEPARATOR}tugas:{ref}"
+    return f"{pertemuan}{ID_SEPARATOR}{_normalize(pengumpulan_title)}"
+
+
+class TugasIndex:
+    """
+    {tugas_id: {"course", "pertemuan", "title", "semester", "active",
+    "deadline_iso", "first_seen", "last_seen", "last_verified"}} persisted
+    as JSON, with timestamps in ISO format.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Error loading tugas index, starting fresh: {e}")
+            return
+        if data.get("version") == INDEX_VERSION:
+            self.entries = data.get("tugas", {})
+        else:
+            # Old {legacy_key: bool} state: its keys cannot be mapped to IDs, so
+            # every tugas is simply verified once on this run.
+            print(f"Ignoring {len(data)} legacy tugas state entries; they will be re-verified.")
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, tugas):
+        return self.entries.get(tugas)
+
+    def save(self):
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": INDEX_VERSION, "tugas": self.entries}, f, ensure_ascii=False, indent=4)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving tugas index: {e}")
+
+    def should_scrape(self, tugas, now=None):
+        """
+        Returns (scrape, reason). Unknown and active tugas are always opened;
+        inactive ones only when their re-verification is due.
+        """
+        entry = self.entries.get(tugas)
+        if entry is None:
+            return True, "new"
+        if entry["active"]:
+            return True, "active"
+        now = now or datetime.now()
+        deadline = entry.get("deadline_iso")
+        if deadline and now - datetime.fromisoformat(deadline) <= timedelta(days=REVERIFY_RECENT_DAYS):
+            return True, "deadline passed recently"
+        verified = entry.get("last_verified")
+        if not verified or now - datetime.fromisoformat(verified) >= timedelta(days=REVERIFY_INACTIVE_DAYS):
+            return True, "re-verify"
+        return False, "inactive"
+
+    def seen(self, tugas, now=None):
+        """Marks a tugas as still listed, without opening it."""
+        entry = self.entries.get(tugas)
+        if entry is not None:
+            entry["last_seen"] = (now or datetime.now()).isoformat()
+
+    def record(self, tugas, tugas_list, course, pertemuan, title, semester, now=None):
+        """
+        Stores what the tugas page showed. Returns a short description of what
+        changed since the last verification, or None.
+        """
+        now_iso = (now or datetime.now()).isoformat()
+        active = any(t.active for t in tugas_list)
+        deadlines = sorted(t.deadline_iso for t in tugas_list if t.deadline_iso)
+        deadline = deadlines[-1] if deadlines else None
+        previous = self.entries.get(tugas)
+        self.entries[tugas] = {
+            "course": course,
+            "pertemuan": pertemuan,
+            "title": title,
+            "semester": semester,
+            "active": active,
+            "deadline_iso": deadline,
+            "first_seen": previous["first_seen"] if previous else now_iso,
+            "last_seen": now_iso,
+            "last_verified": now_iso
+        }
+        if previous is None:
+            return "new"
+        if previous.get("deadline_iso") != deadline:
+            return f"deadline changed {previous.get('deadline_iso')} -> {deadline}"
+        if previous["active"] != active:
+            return "active again" if active else "closed"
+        return None
+
+    def expire(self, current_semesters, now=None):
+        """
+        Drops entries from semesters no longer on the courses list, and any
+        not seen for STATE_TTL_DAYS. Returns how many were removed.
+        """
+        now = now or datetime.now()
+        cutoff = (now - timedelta(days=STATE_TTL_DAYS)).isoformat()
+        current_semesters = {_normalize(s) for s in current_semesters if s}
+        expired = [
+            key for key, entry in self.entries.items()
+            if (current_semesters and _normalize(entry.get("semester")) not in current_semesters)
+            or entry.get("last_seen", "") < cutoff
+        ]
+        for key in expired:
+            del self.entries[key]
+        return len(expired)
@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import sqlite3
+from dataclasses import dataclass
+
+# Durable SQLite work queue for splitting a scrape across worker processes
+# (`python Scraper.py queue worker`). Tasks are claimed with a lease; a task
+# whose worker dies becomes visible again once its lease expires, and a task
+# that keeps failing is parked as 'failed' after MAX_ATTEMPTS. Completing a
+# task may enqueue follow-up tasks in the same transaction, so the queue
+# never loses work between "course done" and "its pertemuan enqueued".
+#
+# There is no lease heartbeat: a task (one page capture, a few retries at most)
+# must finish within VISIBILITY_TIMEOUT_SECONDS, or it is handed to another worker.
+#
+# Workers on other hosts can share the queue only through a filesystem with
+# working POSIX locks; SQLite over most network filesystems is not safe.
+
+QUEUE_FILE = "scrape_queue.sqlite3"
+VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("QUEUE_VISIBILITY_TIMEOUT", "300"))
+MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", "3"))
+RETRY_DELAY_SECONDS = 5
+
+STATUS_PENDING = "pending"
+STATUS_LEASED = "leased"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_claim ON tasks (status, priority, available_at);
+"""
+
+
+@dataclass(slots=True)
+class Task:
+    id: int
+    kind: str
+    key: str
+    payload: dict
+    attempts: int
+    lease_owner: str
+
+
+class WorkQueue:
+    """One connection per process; every public method is its own transaction."""
+
+    def __init__(self, path=QUEUE_FILE, visibility_timeout=VISIBILITY_TIMEOUT_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _transaction(self):
+        return _Transaction(self.conn)
+
+    def reset(self):
+        """Drops every task, e.g. before seeding a new run."""
+        with self._transaction():
+            self.conn.execute("DELETE FROM tasks")
+
+    def _insert(self, kind, key, payload, priority, now):
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO tasks (kind, key, payload, priority, available_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, key, json.dumps(payload, ensure_ascii=False), priority, now, now)
+        )
+        return cursor.rowcount == 1
+
+    def enqueue(self, kind, key, payload, priority=0):
+        """Adds a task unless one with the same key exists. Returns True if it was added."""
+        with self._transaction():
+            return self._insert(kind, key, payload, priority, time.time())
+
+    def claim(self, owner):
+        """
+        Leases the most urgent available task (or one whose lease expired) to
+        `owner`. An expired lease that already used max_attempts is parked as
+        failed instead: its worker died every time, so handing it out again
+        would retry it forever and the queue would never complete.
+        """
+        now = time.time()
+        with self._transaction():
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, error = COALESCE(error, ?), lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE status = ? AND lease_expires <= ? AND attempts >= ?",
+                (STATUS_FAILED, "Lease expired on the last attempt (worker died or hung)", now,
+                 STATUS_LEASED, now, self.max_attempts)
+            )
+            row = self.conn.execute(
+                "SELECT id, kind, key, payload, attempts FROM tasks "
+                "WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires <= ?) "
+                "ORDER BY priority, id LIMIT 1",
+                (STATUS_PENDING, now, STATUS_LEASED, now)
+            ).fetchone()
+            if row is None:
+                return None
+            task_id, kind, key, payload, attempts = row
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                (STATUS_LEASED, owner, now + self.visibility_timeout, now, task_id)
+            )
+        return Task(id=task_id, kind=kind, key=key, payload=json.loads(payload),
+                    attempts=attempts + 1, lease_owner=owner)
+
+    def complete(self, task, result, children=()):
+        """
+        Stores the result and enqueues `children` ((kind, key, payload, priority)
+        tuples) atomically. The first completion wins: if the lease expired and
+        another worker already finished the task, this one is discarded.
+        """
+        now = time.time()
+        with self._transaction():
+            cursor = self.conn.execute(
+                "UPDATE tasks SET status = ?, result = ?, error = NULL, lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE id = ? AND status != ?",
+                (STATUS_DONE, json.dumps(result, ensure_ascii=False), now, task.id, STATUS_DONE)
+            )
+            if cursor.rowcount == 0:
+                return False
+            for kind, key, payload, priority in children:
+                self._insert(kind, key, payload, priority, now)
+        return True
+
+    def fail(self, task, error):
+        """
+        Makes the task available again after a delay, or parks it as failed
+        after max_attempts. Only the current lease can fail a task: if this
+        lease expired and another worker claimed the task since, nothing
+        changes. Returns True if the task was parked as failed.
+        """
+        now = time.time()
+        final = task.attempts >= self.max_attempts
+        with self._transaction():
+            cursor = self.conn.execute(
+                "UPDATE tasks SET status = ?, error = ?, available_at = ?, lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ? AND attempts = ?",
+                (STATUS_FAILED if final else STATUS_PENDING, str(error)[:2000],
+                 now + RETRY_DELAY_SECONDS * task.attempts, now, task.id, STATUS_LEASED, task.lease_owner,
+                 task.attempts)
+            )
+        return final and cursor.rowcount > 0
+
+    def counts(self):
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        counts = {STATUS_PENDING: 0, STATUS_LEASED: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def is_complete(self):
+        """True once there is at least one task and none is pending or leased."""
+        counts = self.counts()
+        return sum(counts.values()) > 0 and counts[STATUS_PENDING] == 0 and counts[STATUS_LEASED] == 0
+
+    def results(self, kind):
+        """(payload, result) for every finished task of `kind`, in insertion order."""
+        rows = self.conn.execute(
+            "SELECT payload, result FROM tasks WHERE kind = ? AND status = ? ORDER BY id",
+            (kind, STATUS_DONE)
+        ).fetchall()
+        return [(json.loads(payload), json.loads(result)) for payload, result in rows]
+
+    def failures(self):
+        return self.conn.execute(
+            "SELECT kind, key, attempts, error FROM tasks WHERE status = ? ORDER BY id", (STATUS_FAILED,)
+        ).fetchall()
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE takes the write lock up front, so two workers never claim the same task."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        return False